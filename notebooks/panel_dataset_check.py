@@ -0,0 +1,63 @@
+'''Regression check of the panel based `create_stock_dataset` against the original per-symbol implementation.
+
+Symbols with diverging trading days (extra bars or missing days) have to produce the same windows as before.
+'''
+
+import numpy as np
+import pandas as pd
+import sys
+sys.path.insert(1, '..')
+from recommender.learning.preprocess import create_stock_dataset, normalize_stock_window
+
+as_strided = np.lib.stride_tricks.as_strided
+
+
+def create_stock_dataset_reference(df, days_back, days_target, smooth_interval, value_col='close', jump_size=7):
+  '''Original per-symbol implementation of `create_stock_dataset`.'''
+  win = days_back + days_target + (smooth_interval if smooth_interval is not None else 0)
+  cols = ["day_{}".format(i+1) for i in range(days_back)] + ["norm_price", "target"]
+  df_symbol = df['symbol'].str.lower()
+  df_norm = []
+  for symbol in df['symbol'].unique():
+    df_sym = df[df_symbol == symbol.lower()].sort_values(by='date').set_index('date')[[value_col]]
+    df_arr = np.copy(df_sym.to_numpy())
+    st = df_arr.strides
+    sz = np.ceil((len(df_arr) - (win-1)) / jump_size)
+    if sz <= 0: continue
+    wnds = as_strided(df_arr, (int(sz), win), (st[0] * jump_size, st[1] * 1), writeable=False)
+    df_res = pd.DataFrame(np.apply_along_axis(lambda wnd: normalize_stock_window(wnd, days_back, days_target, smooth_interval), axis=1, arr=wnds))
+    df_res.columns = cols
+    df_res.index = df_sym.index[:-(win-1)][0::jump_size]
+    df_res['symbol'] = symbol
+    df_norm.append(df_res)
+  return pd.concat(df_norm, axis=0)
+
+def make_prices(symbol, dates, seed):
+  rnd = np.random.RandomState(seed)
+  return pd.DataFrame({'symbol': symbol, 'date': dates, 'close': 100 + rnd.randn(len(dates)).cumsum()})
+
+def check(df, name, **kwargs):
+  ref = create_stock_dataset_reference(df.copy(), **kwargs).reset_index().sort_values(['symbol', 'date']).reset_index(drop=True)
+  res = create_stock_dataset(df.copy(), **kwargs).reset_index().sort_values(['symbol', 'date']).reset_index(drop=True)
+  assert len(ref) == len(res), "{}: {} windows expected, got {}".format(name, len(ref), len(res))
+  assert (ref['date'].values == res['date'].values).all(), "{}: window dates differ".format(name)
+  assert (ref['symbol'].values == res['symbol'].values).all(), "{}: symbols differ".format(name)
+  cols = [col for col in ref.columns if col not in ['date', 'symbol']]
+  # note: the panel stores float32 values
+  assert np.allclose(ref[cols].values, res[cols].values, rtol=1e-4, atol=1e-5, equal_nan=True), "{}: values differ".format(name)
+  print("{}: {} windows ok".format(name, len(res)))
+
+
+days = pd.bdate_range('2019-01-01', periods=200)
+kwargs = {'days_back': 7, 'days_target': 30, 'smooth_interval': 3, 'jump_size': 7}
+
+# aligned symbols
+check(pd.concat([make_prices('AAA', days, 1), make_prices('BBB', days, 2)]), 'aligned', **kwargs)
+# second symbol has an extra bar
+extra = days.append(pd.DatetimeIndex([days[-1] + pd.Timedelta(days=1)]))
+check(pd.concat([make_prices('AAA', days, 1), make_prices('BBB', extra, 2)]), 'extra bar', **kwargs)
+# symbol misses a single day (halt)
+check(pd.concat([make_prices('AAA', days, 1), make_prices('BBB', days.delete(50), 2)]), 'missing day', **kwargs)
+# different history lengths and no smoothing
+check(pd.concat([make_prices('AAA', days[20:], 1), make_prices('BBB', days[:150].delete([10, 11, 90]), 2)]), 'ragged',
+  days_back=5, days_target=10, smooth_interval=None, jump_size=3)
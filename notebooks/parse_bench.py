@@ -0,0 +1,68 @@
+'''Benchmark of the typed parsing layer against the previous dict-append parsing of the FMP responses.
+
+Run with: `python parse_bench.py`
+'''
+
+import json
+import timeit
+import numpy as np
+import pandas as pd
+import sys
+sys.path.insert(1, '..')
+from recommender.contrib import fmp_api
+
+parse, utils = fmp_api.parse, fmp_api.utils
+
+
+def create_payload(rows=2000, cols=60):
+  '''Creates a synthetic statement response (numbers as strings and some empty values).'''
+  rnd = np.random.RandomState(42)
+  records = []
+  for i in range(rows):
+    rec = {'date': '{}-12-31'.format(1900 + i % 120)}
+    for j in range(cols):
+      rec['field{}'.format(j)] = '' if rnd.rand() < 0.05 else '{:.4f}'.format(rnd.randn() * 1e6)
+    records.append(rec)
+  return {'growth': records}
+
+def parse_loop(data):
+  '''Previous implementation (dict-append loop, regex replace and dtype concat).'''
+  items = {}
+  dates = []
+  for rat in data['growth']:
+    rat = dict(rat)
+    dates.append(rat.pop('date'))
+    for key in rat:
+      if key in items:
+        items[key].append(rat[key])
+      else:
+        items[key] = [rat[key]]
+  df = pd.DataFrame(items).assign(date=dates).replace(r'^\s*$', np.nan, regex=True)
+  return utils.convert_dtype(df, 'float32', ['date'])
+
+def parse_typed(data):
+  '''Typed parsing layer.'''
+  return parse.records_to_frame(data['growth'], exclude=['date'])
+
+def parse_stream(text):
+  '''Typed parsing layer on the incremental stream parser.'''
+  chunks = (text[i:i + (1 << 16)] for i in range(0, len(text), 1 << 16))
+  return parse.records_to_frame(parse.iter_records(chunks, 'growth'), exclude=['date'])
+
+
+data = create_payload()
+text = json.dumps(data)
+
+# check that all versions yield the same values
+df_loop, df_typed, df_stream = parse_loop(data), parse_typed(data), parse_stream(text)
+cols = [col for col in df_loop.columns if col != 'date']
+assert np.allclose(df_loop[cols].values, df_typed[cols].values, equal_nan=True)
+assert np.allclose(df_typed[cols].values, df_stream[cols].values, equal_nan=True)
+
+n = 5
+t_loop = timeit.timeit(lambda: parse_loop(data), number=n) / n
+t_typed = timeit.timeit(lambda: parse_typed(data), number=n) / n
+t_stream = timeit.timeit(lambda: parse_stream(text), number=n) / n
+print("dict-append loop: {:.3f}s".format(t_loop))
+print("typed parsing:    {:.3f}s ({:.1f}x)".format(t_typed, t_loop / t_typed))
+print("stream parsing:   {:.3f}s (incl. json decoding)".format(t_stream))
@@ -0,0 +1,41 @@
+'''Regression check of `resample_bars` on a regular trading session.
+
+Every bar has to cover the full interval starting at the session open (only the last bar is cut at the close).
+'''
+
+import numpy as np
+import pandas as pd
+import sys
+sys.path.insert(1, '..')
+from recommender.stocks.AlphaVantageTicker import resample_bars
+
+
+def make_session(day):
+  idx = pd.date_range('{} 09:31'.format(day), '{} 16:00'.format(day), freq='1min', tz='US/Eastern')
+  vals = np.arange(len(idx), dtype=float)
+  return pd.DataFrame({'open': vals, 'high': vals + 1, 'low': vals - 1, 'close': vals + .5, 'volume': 1}, index=idx)
+
+def check(df, minutes, first, last, days=1):
+  res = resample_bars(df, minutes)
+  per_day = int(np.ceil(390 / minutes))
+  assert len(res) == per_day * days, "{}min: {} bars expected, got {}".format(minutes, per_day * days, len(res))
+  assert res.index[0].strftime('%H:%M') == first, "{}min: first bar labeled {}".format(minutes, res.index[0])
+  assert res.index[-1].strftime('%H:%M') == last, "{}min: last bar labeled {}".format(minutes, res.index[-1])
+  vol = res['volume'].values.reshape(days, per_day)
+  # all bars except the last of each session cover the full interval
+  assert (vol[:, :-1] == minutes).all(), "{}min: short bars {}".format(minutes, res['volume'].tolist())
+  assert (vol[:, -1] == 390 - minutes * (per_day - 1)).all(), "{}min: last bar {}".format(minutes, vol[:, -1])
+  assert res['open'].iloc[0] == df['open'].iloc[0] and res['close'].iloc[-1] == df['close'].iloc[-1]
+  print("{}min: {} bars ok".format(minutes, len(res)))
+
+
+df = make_session('2020-01-10')
+check(df, 5, '09:35', '16:00')
+check(df, 30, '10:00', '16:00')
+check(df, 45, '10:15', '16:00')
+check(df, 60, '10:30', '16:00')
+
+# multiple sessions (bins must not drift across days)
+df = pd.concat([make_session('2020-01-09'), make_session('2020-01-10')])
+for minutes, first in [(7, '09:37'), (45, '10:15'), (60, '10:30')]:
+  check(df, minutes, first, '16:00', days=2)
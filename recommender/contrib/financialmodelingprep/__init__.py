@@ -1,7 +1,10 @@
 '''Setup all relevant packages.'''
 
+from . import cache
+from . import parse
 from . import utils
 from . import statements
 from . import profile
 from . import indicators
 from . import prices
+from . import aio
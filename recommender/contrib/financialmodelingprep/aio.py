@@ -0,0 +1,173 @@
+'''Asynchronous variants of the API functions.
+
+Requests are executed on a thread pool through the shared keep-alive session of `utils.fetch` (including retries),
+while a semaphore caps the number of concurrent requests per event loop.
+
+Example:
+  ```
+  df, errors = aio.run(aio.list_profiles(['AAPL', 'MSFT']))
+  ```
+'''
+
+import asyncio
+import functools
+import threading
+import weakref
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from . import utils
+from . import statements
+from . import profile
+from . import cache
+from . import parse
+from recommender.utils import ratelimit
+
+# maximal number of concurrent requests
+MAX_CONCURRENCY = 16
+
+_executor = None
+_executor_lock = threading.Lock()
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def set_concurrency(limit):
+  '''Sets the maximal number of concurrent requests.'''
+  global MAX_CONCURRENCY, _executor
+  with _executor_lock:
+    MAX_CONCURRENCY = limit
+    if _executor is not None:
+      _executor.shutdown(wait=False)
+      _executor = None
+  _semaphores.clear()
+
+def _get_executor():
+  '''Retrieves the thread pool that executes the requests.'''
+  global _executor
+  with _executor_lock:
+    if _executor is None:
+      _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+    return _executor
+
+def _semaphore(concurrency=None):
+  '''Retrieves the semaphore of the current event loop.'''
+  loop = asyncio.get_event_loop()
+  if concurrency is not None:
+    return asyncio.Semaphore(concurrency)
+  if loop not in _semaphores:
+    _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENCY)
+  return _semaphores[loop]
+
+def run(coro):
+  '''Executes the coroutine synchronously and returns its result.
+
+  If called from a running event loop (e.g. inside jupyter), the coroutine is executed on a separate thread.
+  '''
+  try:
+    running = asyncio.get_running_loop().is_running()
+  except RuntimeError:
+    running = False
+  if not running:
+    loop = asyncio.new_event_loop()
+    try:
+      return loop.run_until_complete(coro)
+    finally:
+      loop.close()
+  with ThreadPoolExecutor(max_workers=1) as pool:
+    return pool.submit(run, coro).result()
+
+async def fetch(url, type='get', body=None, semaphore=None):
+  '''Fetches information from the API (see `utils.fetch`).
+
+  Args:
+    url (str): The url of data to retrieve
+    type (str): The type of the request (options: ['get', 'post', 'options'])
+    body (dict): Optional body of a post request
+    semaphore (asyncio.Semaphore): Semaphore to limit concurrency (if None use the default of the event loop)
+  '''
+  # serve cached responses without waiting for the budget
+  store = cache.get_cache() if type.lower() == 'get' else None
+  if store is not None:
+    hit, data = store.lookup(url)
+    if hit:
+      return data
+
+  async with (semaphore or _semaphore()):
+    # wait for the budget without blocking the event loop
+    await ratelimit.acquire_async('fmp')
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(utils.fetch, url, type, body, limit=False))
+
+async def income(symbol, period='annual', semaphore=None):
+  '''Async version of `statements.income`.'''
+  url = statements._period_url('financials/income-statement', symbol, period)
+  return statements._parse_financials(await fetch(url, semaphore=semaphore))
+
+async def balance_sheet(symbol, period='annual', semaphore=None):
+  '''Async version of `statements.balance_sheet`.'''
+  url = statements._period_url('financials/balance-sheet-statement', symbol, period)
+  return statements._parse_financials(await fetch(url, semaphore=semaphore))
+
+async def cash_flow(symbol, period='annual', semaphore=None):
+  '''Async version of `statements.cash_flow`.'''
+  url = statements._period_url('financials/cash-flow-statement', symbol, period)
+  return statements._parse_financials(await fetch(url, semaphore=semaphore))
+
+async def growth(symbol, period='annual', semaphore=None):
+  '''Async version of `statements.growth`.'''
+  url = statements._period_url('financial-statement-growth', symbol, period)
+  return statements._parse_growth(await fetch(url, semaphore=semaphore))
+
+async def get_profile(symbol, semaphore=None):
+  '''Async version of `profile.get_profile`.'''
+  url = utils.build_url('company/profile', symbol)
+  return pd.DataFrame(await fetch(url, semaphore=semaphore))
+
+async def get_profiles(symbols, batch_size=100, semaphore=None):
+  '''Async version of `profile.get_profiles` that requests all batches concurrently.
+
+  Returns:
+    profiles (DataFrame): Company profiles indexed by symbol (symbols without profile are missing)
+    errors (dict): Dictionary of symbol to the raised exception (for all symbols of failed batches)
+  '''
+  batches = list(utils.batch_symbols(symbols, batch_size))
+  urls = [utils.build_url('company/profile', batch) for batch in batches]
+  data = await asyncio.gather(*[fetch(url, semaphore=semaphore) for url in urls], return_exceptions=True)
+  rows, errors = [], {}
+  for batch, item in zip(batches, data):
+    if isinstance(item, Exception):
+      errors.update((symbol, item) for symbol in batch.split(','))
+      continue
+    rows += profile._parse_profiles(item)
+  return profile._rows_frame(rows), errors
+
+async def get_quotes(symbols, batch_size=100, semaphore=None):
+  '''Async version of `profile.get_quotes` that requests all batches concurrently.'''
+  urls = [utils.build_url('quote', batch) for batch in utils.batch_symbols(symbols, batch_size)]
+  data = await asyncio.gather(*[fetch(url, semaphore=semaphore) for url in urls])
+  rows = []
+  for item in data:
+    rows += item if isinstance(item, list) else [item]
+  return profile._rows_frame(rows)
+
+async def list_symbols(semaphore=None):
+  '''Async version of `profile.list_symbols`.'''
+  url = utils.build_url('company/stock', 'list')
+  data = await fetch(url, semaphore=semaphore)
+  return parse.records_to_frame(data['symbolsList'], exclude=['symbol', 'name', 'exchange'], dtype='float64')
+
+async def list_profiles(symbols=None, concurrency=None, batch_size=100):
+  '''Async version of `profile.list_profiles` that fetches all profile batches concurrently.
+
+  Args:
+    symbols (list): List of symbols to retrieve profiles for (if None use `list_symbols`)
+    concurrency (int): Maximal number of concurrent requests (if None use `MAX_CONCURRENCY`)
+    batch_size (int): Maximal number of symbols per request
+
+  Returns:
+    profiles (DataFrame): Company profiles indexed by symbol
+    errors (dict): Dictionary of symbol to the raised exception (for all symbols of failed batches)
+  '''
+  sem = _semaphore(concurrency)
+  if symbols is None:
+    symbols = (await list_symbols(sem))['symbol'].values
+  return await get_profiles(symbols, batch_size, sem)
@@ -0,0 +1,208 @@
+'''Content-addressed response cache for the API.
+
+Responses are stored as gzip compressed json files named by the hash of the normalized url (without api key).
+Each entry holds the fetch timestamp and the validators (`ETag`, `Last-Modified`) of the response, so stale entries can be
+revalidated with a conditional request. In `replay` mode all responses are served from disk without network access.
+
+Example:
+  ```
+  fmp_api.cache.enable('../data/Responses', mode='cache')
+  df = fmp_api.statements.income('AAPL')    # downloaded once, served from disk afterwards
+  fmp_api.cache.enable('../data/Responses', mode='replay')
+  ```
+'''
+
+import os
+import time
+import gzip
+import json
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from recommender.utils import files
+
+# available modes of the cache
+MODES = ['cache', 'record', 'replay']
+# time-to-live in seconds per endpoint (longest matching prefix of the path after the version)
+DEFAULT_TTLS = {
+  'financials': 24 * 3600,
+  'financial-statement-growth': 24 * 3600,
+  'company-key-metrics': 24 * 3600,
+  'financial-ratios': 24 * 3600,
+  'company/profile': 24 * 3600,
+  'company/stock/list': 24 * 3600,
+  'historical-price-full': 12 * 3600,
+  'quote': 0
+}
+# time-to-live of endpoints that are not listed in the ttls
+DEFAULT_TTL = 3600
+# query parameters that are removed from the key
+_SECRET_PARAMS = ['apikey', 'api_key', 'token']
+
+_cache = None
+
+
+def normalize_url(url):
+  '''Normalizes the url (lower case host, sorted query and without api key).'''
+  parts = urlsplit(url)
+  query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key.lower() not in _SECRET_PARAMS)
+  return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), urlencode(query), ''))
+
+def endpoint(url):
+  '''Retrieves the endpoint of the url (path after the api version, e.g. `financials/income-statement/AAPL`).'''
+  path = urlsplit(url).path.strip('/').split('/')
+  for i, part in enumerate(path):
+    if len(part) > 1 and part[0] == 'v' and part[1:].isdigit():
+      return '/'.join(path[i + 1:])
+  return '/'.join(path)
+
+
+class ResponseCache():
+  '''Stores the json responses of the API on disk.
+
+  Args:
+    folder (str): Folder to store the responses in
+    mode (str): Mode of the cache. Options are:
+      `cache` (serve fresh entries from disk, revalidate stale ones),
+      `record` (always request and store the responses),
+      `replay` (only serve from disk and raise a `KeyError` for missing entries)
+    ttls (dict): Dictionary of endpoint prefixes to the time-to-live in seconds (overwrites the `DEFAULT_TTLS`)
+  '''
+  def __init__(self, folder, mode='cache', ttls=None):
+    if mode not in MODES:
+      raise ValueError("Unkown cache mode ({})".format(mode))
+    self.path = folder
+    self.mode = mode
+    self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+    # order prefixes by length to find the longest match first
+    self._prefixes = sorted(self.ttls.keys(), key=len, reverse=True)
+
+  def key(self, url):
+    '''Retrieves the content address of the given url.'''
+    return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+  def file(self, url):
+    '''Retrieves the path of the cache entry for the given url.'''
+    key = self.key(url)
+    return os.path.join(self.path, key[:2], '{}.json.gz'.format(key))
+
+  def ttl(self, url):
+    '''Retrieves the time-to-live in seconds of the given url.'''
+    point = endpoint(url)
+    for prefix in self._prefixes:
+      if point.startswith(prefix):
+        return self.ttls[prefix]
+    return DEFAULT_TTL
+
+  def get(self, url):
+    '''Retrieves the cache entry of the given url (or None).
+
+    Returns:
+      Dictionary with `url`, `time`, `etag`, `last_modified` and `body` (the parsed json)
+    '''
+    file = self.file(url)
+    if not os.path.exists(file):
+      return None
+    try:
+      with gzip.open(file, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      # note: treat corrupted entries as missing
+      return None
+
+  def fresh(self, url, entry):
+    '''Checks if the entry of the given url can be served without revalidation.'''
+    if entry is None:
+      return False
+    return self.mode == 'replay' or time.time() - entry['time'] < self.ttl(url)
+
+  def lookup(self, url):
+    '''Retrieves the body of the url if it can be served from disk.
+
+    Returns:
+      hit (bool): Defines if the entry was found
+      body: The parsed json response (or None)
+    '''
+    if self.mode == 'record':
+      return False, None
+    entry = self.get(url)
+    if self.fresh(url, entry):
+      return True, entry['body']
+    if self.mode == 'replay':
+      raise KeyError("No cached response for {} (replay mode)".format(normalize_url(url)))
+    return False, None
+
+  def headers(self, url):
+    '''Retrieves the headers for a conditional request of the (stale) entry of the given url.'''
+    entry = None if self.mode == 'record' else self.get(url)
+    if entry is None:
+      return {}
+    headers = {}
+    if entry.get('etag') is not None:
+      headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified') is not None:
+      headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+  def put(self, url, body, headers=None):
+    '''Stores the response of the given url.
+
+    Args:
+      url (str): Url of the request
+      body: The parsed json response
+      headers (dict): Headers of the response (used for revalidation)
+    '''
+    headers = headers or {}
+    entry = {
+      'url': normalize_url(url), 'time': time.time(),
+      'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified'),
+      'body': body
+    }
+    def write(tmp):
+      with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        json.dump(entry, f)
+    files.atomic_write(self.file(url), write)
+
+  def touch(self, url):
+    '''Marks the entry of the given url as fresh (after a `304 Not Modified` response) and returns its body.'''
+    entry = self.get(url)
+    self.put(url, entry['body'], {'ETag': entry.get('etag'), 'Last-Modified': entry.get('last_modified')})
+    return entry['body']
+
+  def clear(self):
+    '''Removes all entries from the cache.
+
+    Returns:
+      Number of removed entries
+    '''
+    count = 0
+    for root, _, names in os.walk(self.path):
+      for name in names:
+        if name.endswith('.json.gz'):
+          os.remove(os.path.join(root, name))
+          count += 1
+    return count
+
+
+def enable(folder, mode='cache', ttls=None):
+  '''Enables the response cache for all requests through `utils.fetch`.
+
+  Args:
+    folder (str): Folder to store the responses in
+    mode (str): Mode of the cache (see `ResponseCache`)
+    ttls (dict): Dictionary of endpoint prefixes to the time-to-live in seconds
+
+  Returns:
+    The active `ResponseCache`
+  '''
+  global _cache
+  _cache = ResponseCache(folder, mode, ttls)
+  return _cache
+
+def disable():
+  '''Disables the response cache.'''
+  global _cache
+  _cache = None
+
+def get_cache():
+  '''Retrieves the active response cache (or None if disabled).'''
+  return _cache
@@ -1,8 +1,8 @@
 
 
-import itertools
 import pandas as pd
 from . import utils
+from . import parse
 
 
 def financial_ratio(symbol):
@@ -17,20 +17,17 @@ def financial_ratio(symbol):
   url = utils.build_url('financial-ratios', symbol)
   data = utils.fetch(url)
 
-  # convert all items
+  # convert each group of ratios
   ratios = data['ratios']
+  dates = [rat['date'] for rat in ratios]
+  groups = dict.fromkeys(key for rat in ratios for key in rat if key != 'date')
   items = {}
-  dates = []
-  for rat in ratios:
-      dates.append(rat.pop('date'))
-      for key in rat:
-          if key in items:
-              items[key].append(rat[key])
-          else:
-              items[key] = [rat[key]]
-
-  for key in items:
-      items[key] = pd.DataFrame(items[key]).assign(date=dates).set_index('date')
+  for group in groups:
+    df = parse.records_to_frame([rat.get(group) or {} for rat in ratios], exclude=None)
+    # note: groups that are empty for all dates result in rows without values
+    if len(df) != len(dates):
+      df = pd.DataFrame(index=range(len(dates)))
+    items[group] = df.assign(date=dates).set_index('date')
 
   return items
 
@@ -80,16 +77,4 @@ def key_metrics(symbol, period='annual'):
   url = utils.build_url('company-key-metrics', symbol)
   data = utils.fetch(url)
 
-  # convert all items
-  ratios = data['metrics']
-  items = {}
-  dates = []
-  for rat in ratios:
-      dates.append(rat.pop('date'))
-      for key in rat:
-          if key in items:
-              items[key].append(rat[key])
-          else:
-              items[key] = [rat[key]]
-
-  return pd.DataFrame(items).assign(date=dates)
+  return parse.records_to_frame(data['metrics'], exclude=['date'])
@@ -0,0 +1,134 @@
+'''Typed parsing of the API responses into DataFrames.
+
+Records (list of dicts) are converted column-wise into `float32` arrays, whereby empty strings are treated as `NaN`.
+Large list responses can be parsed incrementally from the text stream of the response (see `iter_records`).
+'''
+
+import json
+import codecs
+import itertools
+import numpy as np
+import pandas as pd
+
+# number of records that are converted at once when parsing a stream
+CHUNK_SIZE = 10000
+# characters that are skipped between the elements of a list
+_SEPARATORS = ' \t\r\n,'
+
+
+def to_float(values, dtype='float32'):
+  '''Converts a list of raw values (numbers, numeric strings, empty strings or None) into a typed array.
+
+  Args:
+    values (list): List of raw values
+    dtype (str): Name of the dtype of the array
+
+  Returns:
+    `np.ndarray` of the given dtype with `NaN` for empty or non-numeric values
+  '''
+  arr = np.asarray(values, dtype=object)
+  return pd.to_numeric(arr, errors='coerce').astype(dtype)
+
+def _convert(records, exclude, dtype):
+  '''Converts a list of records into a DataFrame (see `records_to_frame`).'''
+  # note: preserve the order of the keys (in case records have different keys)
+  keys = list(dict.fromkeys(itertools.chain.from_iterable(records)))
+  cols = {}
+  for key in keys:
+    values = [rec.get(key) for rec in records]
+    cols[key] = values if key in exclude else to_float(values, dtype)
+  return pd.DataFrame(cols, columns=keys)
+
+def records_to_frame(records, exclude=('date',), dtype='float32', chunk_size=CHUNK_SIZE):
+  '''Converts records into a DataFrame with typed columns.
+
+  Example:
+    ```
+    df = records_to_frame(data['financials'], exclude=['date'])
+    ```
+
+  Args:
+    records (list): List (or iterator) of dicts
+    exclude (list): Columns that are kept as raw values (e.g. dates or names)
+    dtype (str): Name of the dtype for all other columns
+    chunk_size (int): Number of records to convert at once if `records` is an iterator
+
+  Returns:
+    DataFrame with one row per record
+  '''
+  exclude = set(exclude or [])
+  if isinstance(records, list):
+    return _convert(records, exclude, dtype) if len(records) > 0 else pd.DataFrame()
+
+  # convert the stream in chunks to limit the memory of the raw records
+  records = iter(records)
+  parts = []
+  while True:
+    chunk = list(itertools.islice(records, chunk_size))
+    if len(chunk) == 0:
+      break
+    parts.append(_convert(chunk, exclude, dtype))
+  if len(parts) == 0:
+    return pd.DataFrame()
+  return pd.concat(parts, axis=0, sort=False, ignore_index=True)
+
+def iter_records(chunks, key=None):
+  '''Incrementally parses the elements of a json list from a stream of text chunks.
+
+  Args:
+    chunks (iterable): Iterable of `str` chunks of the json document (e.g. `response.iter_content(decode_unicode=True)`)
+    key (str): Name of the key that holds the list in the top-level object (if None the document is a list)
+
+  Returns:
+    Generator of the parsed elements
+  '''
+  decoder = json.JSONDecoder()
+  # note: bytes are decoded incrementally, as chunks might split multi-byte characters
+  text = codecs.getincrementaldecoder('utf-8')()
+  chunks = iter(chunks)
+  buf = ''
+
+  def read():
+    nonlocal buf
+    chunk = next(chunks, None)
+    if chunk is None:
+      return False
+    buf += text.decode(chunk) if isinstance(chunk, bytes) else chunk
+    return True
+
+  # find the start of the list
+  pos = 0
+  if key is not None:
+    marker = '"{}"'.format(key)
+    while marker not in buf:
+      if not read():
+        raise ValueError("Could not find the list ({}) in the response".format(key))
+    pos = buf.index(marker) + len(marker)
+  while '[' not in buf[pos:]:
+    if not read():
+      raise ValueError("Unexpected end of the response")
+  pos = buf.index('[', pos) + 1
+
+  # parse the elements one by one
+  while True:
+    while pos < len(buf) and buf[pos] in _SEPARATORS:
+      pos += 1
+    if pos == len(buf):
+      if not read():
+        raise ValueError("Unexpected end of the response")
+      continue
+    if buf[pos] == ']':
+      return
+    try:
+      obj, end = decoder.raw_decode(buf, pos)
+    except json.JSONDecodeError:
+      # element is incomplete
+      if not read():
+        raise
+      continue
+    yield obj
+    pos = end
+    # drop the parsed text
+    if pos > (1 << 16):
+      buf = buf[pos:]
+      pos = 0
@@ -1,4 +1,75 @@
+'''Historical daily prices from the API.
 
+Prices are returned in the columnar format of the price store: a timezone-naive `date` column sorted ascending and
+`float32` columns `open`, `high`, `low`, `close` (and `adjclose`) and `volume`.
+'''
 
 import pandas as pd
 from . import utils
+from . import parse
+
+# maximal number of symbols per request of the historical endpoint
+MAX_BATCH = 5
+# columns of the parsed prices (mapped from the names of the api)
+PRICE_COLUMNS = {'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'adjClose': 'adjclose', 'volume': 'volume'}
+
+
+def _date_meta(start, end):
+  '''Creates the url metadata for the given date range.'''
+  meta = {}
+  if start is not None:
+    meta['from'] = pd.Timestamp(start).strftime('%Y-%m-%d')
+  if end is not None:
+    meta['to'] = pd.Timestamp(end).strftime('%Y-%m-%d')
+  return meta
+
+def _parse_historical(records):
+  '''Converts the records of the historical endpoint into the price format.'''
+  if records is None or len(records) == 0:
+    return pd.DataFrame(columns=['date'] + list(PRICE_COLUMNS.values())).astype({'date': 'datetime64[ns]'})
+  df = parse.records_to_frame(records, exclude=['date', 'label'])
+  cols = [col for col in PRICE_COLUMNS if col in df.columns]
+  df = df.loc[:, ['date'] + cols].rename(columns=PRICE_COLUMNS)
+  df['date'] = pd.to_datetime(df['date'])
+  return df.sort_values(by='date').reset_index(drop=True)
+
+def historical(symbol, start=None, end=None):
+  '''Retrieves the historical daily prices of the given symbol.
+
+  Args:
+    symbol (str): Symbol to retrieve the prices for
+    start (datetime): First date to retrieve (if None from earliest)
+    end (datetime): Last date to retrieve (if None up to current)
+
+  Returns:
+    DataFrame of prices (empty if no data is found)
+  '''
+  url = utils.build_url('historical-price-full', symbol, meta=_date_meta(start, end))
+  data = utils.fetch(url)
+  return _parse_historical(data.get('historical') if isinstance(data, dict) else None)
+
+def historical_batch(symbols, start=None, end=None, batch_size=MAX_BATCH):
+  '''Retrieves the historical daily prices of many symbols with one request per batch.
+
+  Args:
+    symbols (list): List of symbols to retrieve the prices for
+    start (datetime): First date to retrieve (if None from earliest)
+    end (datetime): Last date to retrieve (if None up to current)
+    batch_size (int): Maximal number of symbols per request (the api allows up to `MAX_BATCH`)
+
+  Returns:
+    Dictionary of symbol to DataFrame of prices (symbols without data are missing)
+  '''
+  meta = _date_meta(start, end)
+  prices = {}
+  for batch in utils.batch_symbols(symbols, min(batch_size, MAX_BATCH)):
+    data = utils.fetch(utils.build_url('historical-price-full', batch, meta=meta))
+    if not isinstance(data, dict):
+      continue
+    # note: single symbols are returned without the list
+    for entry in data.get('historicalStockList', [data]):
+      if 'symbol' not in entry or len(entry.get('historical', [])) == 0:
+        continue
+      prices[entry['symbol']] = _parse_historical(entry['historical'])
+
+  return prices
@@ -1,8 +1,22 @@
 
+import warnings
 import pandas as pd
 from . import utils
+from . import parse
 
 
+def _parse_profiles(data):
+  '''Converts the response of the (batched) profile endpoint into a list of rows.'''
+  # note: single symbols are returned without the list
+  entries = data.get('companyProfiles', [data]) if isinstance(data, dict) else data
+  return [dict(entry['profile'], symbol=entry['symbol']) for entry in entries if 'profile' in entry]
+
+def _rows_frame(rows):
+  '''Creates a dataframe indexed by symbol from the given rows.'''
+  if len(rows) == 0:
+    return pd.DataFrame(index=pd.Index([], name='symbol'))
+  return pd.DataFrame(rows).set_index('symbol')
+
 def get_profile(symbol):
   '''Retrieve the company profile for the given symbol.'''
   # retrieve the data
@@ -12,41 +26,62 @@ def get_profile(symbol):
   # parse the data
   return pd.DataFrame(data)
 
-def list_profiles(symbols=None):
+def get_profiles(symbols, batch_size=100):
+  '''Retrieves the company profiles of many symbols with one request per batch.
+
+  Args:
+    symbols (list): List of symbols to retrieve profiles for
+    batch_size (int): Maximal number of symbols per request (batches are also limited by `utils.MAX_URL_LENGTH`)
+
+  Returns:
+    profiles (DataFrame): Company profiles indexed by symbol (symbols without profile are missing)
+    errors (dict): Dictionary of symbol to the raised exception (for all symbols of failed batches)
+  '''
+  # note: import here to avoid circular imports
+  from . import aio
+  return aio.run(aio.get_profiles(symbols, batch_size=batch_size))
+
+def get_quotes(symbols, batch_size=100):
+  '''Retrieves the current quotes of many symbols with one request per batch.
+
+  Args:
+    symbols (list): List of symbols to retrieve quotes for
+    batch_size (int): Maximal number of symbols per request (batches are also limited by `utils.MAX_URL_LENGTH`)
+
+  Returns:
+    Quotes as dataframe indexed by symbol (symbols without quote are missing)
+  '''
+  rows = []
+  for batch in utils.batch_symbols(symbols, batch_size):
+    data = utils.fetch(utils.build_url('quote', batch))
+    rows += data if isinstance(data, list) else [data]
+  return _rows_frame(rows)
+
+def list_profiles(symbols=None, concurrency=None, batch_size=100):
   '''Generates a list of all available company profiles.
 
+  The profiles are fetched in batches (see `get_profiles`) that are requested concurrently through the async client (see `aio.list_profiles`).
+
   Args:
     stocks (list): List of string values to search profiles for (if None use `list_symbols`)
+    concurrency (int): Maximal number of concurrent requests (if None use `aio.MAX_CONCURRENCY`)
+    batch_size (int): Maximal number of symbols per request
 
   Returns:
     Company profiles as dataframe
   '''
-  if symbols is None:
-    symbols = list_symbols()['symbol'].values
-  # iterate through all symbols
-  ls = []
-  for symbol in symbols:
-    try:
-      profile = get_profile(symbol)
-    except:
-      continue
-
-    # check for empty dataframe
-    if profile.empty == True or 'profile' not in profile.columns:
-      continue
-
-    # process the profile
-    ls.append(profile[['profile']].transpose().assign(symbol=symbol).set_index('symbol'))
-
-  # generate final dataframe
-  return pd.concat(ls, axis=0)
+  # note: import here to avoid circular imports
+  from . import aio
+  df, errors = aio.run(aio.list_profiles(symbols, concurrency=concurrency, batch_size=batch_size))
+  if len(errors) > 0:
+    warnings.warn("Could not load the profiles of {} symbols (first error: {})".format(len(errors), next(iter(errors.values()))))
+  return df
 
 def list_symbols():
   '''List all available stock symbols.'''
   url = utils.build_url('company/stock', 'list')
-  data = utils.fetch(url)
-
-  return pd.DataFrame(data['symbolsList'])
+  # note: the list is large, so parse it incrementally
+  return parse.records_to_frame(utils.fetch_records(url, 'symbolsList'), exclude=['symbol', 'name', 'exchange'], dtype='float64')
 
 def find_symbol(name, stocks=None):
   '''Searches the data list based on the given description and returns the symbol.
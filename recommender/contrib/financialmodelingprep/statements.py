@@ -1,9 +1,29 @@
 
-import numpy as np
-import pandas as pd
 from . import utils
+from . import parse
 
 
+def _period_url(category, symbol, period):
+  '''Creates the url for the given statement category and period.'''
+  meta = {}
+  if period == 'quarter':
+    meta['period'] = period
+  return utils.build_url(category, symbol, meta=meta)
+
+def _parse_financials(data):
+  '''Converts the response of a financial statement endpoint into a DataFrame.'''
+  return parse.records_to_frame(data['financials'], exclude=['date'])
+
+def _parse_growth(data):
+  '''Converts the response of the growth endpoint into a DataFrame.'''
+  return parse.records_to_frame(data['growth'], exclude=['date'])
+
+def _run_async(name, symbol, period):
+  '''Executes the statement call through the async client (see `aio`).'''
+  # note: import here to avoid circular imports
+  from . import aio
+  return aio.run(getattr(aio, name)(symbol, period))
+
 def income(symbol, period='annual'):
   '''Retrieves the income statements from the given symbol.
 
@@ -14,15 +34,7 @@ def income(symbol, period='annual'):
   Returns:
     Pandas DataFrame with the relevant statements
   '''
-  meta = {}
-  if period == 'quarter':
-    meta['period'] = period
-  url = utils.build_url('financials/income-statement', symbol, meta=meta)
-  data = utils.fetch(url)
-
-  # convert to datafraem
-  df = pd.DataFrame(data['financials']).replace(r'^\s*$', np.nan, regex=True)
-  return utils.convert_dtype(df, 'float32', ['date'])
+  return _run_async('income', symbol, period)
 
 def balance_sheet(symbol, period='annual'):
   '''Retrieves the relevant balance sheet statements for the given symbol
@@ -34,14 +46,7 @@ def balance_sheet(symbol, period='annual'):
   Returns:
     Pandas DataFrame with the relevant statements
   '''
-  meta = {}
-  if period == 'quarter':
-    meta['period'] = period
-  url = utils.build_url('financials/balance-sheet-statement', symbol, meta=meta)
-  data = utils.fetch(url)
-
-  df = pd.DataFrame(data['financials']).replace(r'^\s*$', np.nan, regex=True)
-  return utils.convert_dtype(df, 'float32', ['date'])
+  return _run_async('balance_sheet', symbol, period)
 
 def cash_flow(symbol, period='annual'):
   '''Retrieves the relevant cash-flow statements for the given symbol.
@@ -53,14 +58,7 @@ def cash_flow(symbol, period='annual'):
   Returns:
     Pandas DataFrame with the relevant statements
   '''
-  meta = {}
-  if period == 'quarter':
-    meta['period'] = period
-  url = utils.build_url('financials/cash-flow-statement', symbol, meta=meta)
-  data = utils.fetch(url)
-
-  df = pd.DataFrame(data['financials']).replace(r'^\s*$', np.nan, regex=True)
-  return utils.convert_dtype(df, 'float32', ['date'])
+  return _run_async('cash_flow', symbol, period)
 
 def growth(symbol, period='annual'):
   '''Retrieves the growth statements for the given symbol.
@@ -72,23 +70,4 @@ def growth(symbol, period='annual'):
   Returns:
     Pandas DataFrame with the relevant statements
   '''
-  meta = {}
-  if period == 'quarter':
-    meta['period'] = period
-  url = utils.build_url('financial-statement-growth', symbol, meta=meta)
-  data = utils.fetch(url)
-
-  # convert all items
-  ratios = data['growth']
-  items = {}
-  dates = []
-  for rat in ratios:
-      dates.append(rat.pop('date'))
-      for key in rat:
-          if key in items:
-              items[key].append(rat[key])
-          else:
-              items[key] = [rat[key]]
-
-  df = pd.DataFrame(items).assign(date=dates).replace(r'^\s*$', np.nan, regex=True)
-  return utils.convert_dtype(df, 'float32', ['date'])
+  return _run_async('growth', symbol, period)
@@ -3,8 +3,43 @@
 
 import pandas as pd
 import numpy as np
-import requests
+import threading
 import json
+from recommender.utils import http, ratelimit
+from . import cache
+from . import parse
+
+# base url of the api (can be changed through `set_session`, e.g. for a local test server)
+BASE_URL = "https://financialmodelingprep.com/api"
+# maximal length of a request url (keeps batched symbol lists below common server limits)
+MAX_URL_LENGTH = 2000
+# timeout for (connect, read) in seconds
+TIMEOUT = http.DEFAULT_TIMEOUT
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+  '''Retrieves the shared keep-alive session that is used for all requests to the API.'''
+  global _session
+  with _session_lock:
+    if _session is None:
+      _session = http.create_session()
+    return _session
+
+def set_session(session=None, base_url=None):
+  '''Replaces the shared session and/or the base url of the API.
+
+  Args:
+    session (requests.Session): Session to use for all requests (if None create a new default session)
+    base_url (str): Base url of the api (e.g. `http://localhost:8000/api` for a local test server - if None keep the current)
+  '''
+  global _session, BASE_URL
+  with _session_lock:
+    _session = session if session is not None else http.create_session()
+  if base_url is not None:
+    BASE_URL = base_url.rstrip('/')
 
 
 def build_url(category, symbol, meta={}, version=3):
@@ -20,30 +55,102 @@ def build_url(category, symbol, meta={}, version=3):
     Created url string
   '''
   # create the basic string
-  base = "https://financialmodelingprep.com/api/v{}".format(version)
+  base = "{}/v{}".format(BASE_URL, version)
   # build the metadata
   metadata = '&'.join(["{}={}".format(key, meta[key]) for key in meta])
   # build the final data
   return "{}/{}/{}{}".format(base, category, symbol, "?{}".format(metadata) if len(metadata) > 0 else "")
 
-def fetch(url, type='get', body=None):
+def batch_symbols(symbols, batch_size=100, max_length=None):
+  '''Splits the symbols into comma-separated batches for the multi-symbol endpoints.
+
+  Args:
+    symbols (list): List of symbols to split
+    batch_size (int): Maximal number of symbols per batch
+    max_length (int): Maximal number of characters of a batch (if None derive it from `MAX_URL_LENGTH`)
+
+  Returns:
+    Generator of comma-separated symbol strings
+  '''
+  # note: reserve space for the base url and metadata
+  max_length = max_length or (MAX_URL_LENGTH - len(BASE_URL) - 100)
+  batch, length = [], 0
+  for symbol in symbols:
+    if len(batch) > 0 and (len(batch) >= batch_size or length + len(symbol) + 1 > max_length):
+      yield ','.join(batch)
+      batch, length = [], 0
+    batch.append(symbol)
+    length += len(symbol) + 1
+  if len(batch) > 0:
+    yield ','.join(batch)
+
+def fetch(url, type='get', body=None, limit=True):
   '''Fetches information from the API.
 
+  Requests are send through the shared session (see `get_session`) and retried with exponential backoff on 429/5xx errors.
+  Each request is paced by the shared `fmp` rate limiter (see `recommender.utils.ratelimit`).
+  If the response cache is enabled (see `cache.enable`), get requests are served from disk or revalidated.
+
   Args:
     url (str): The url of data to retrieve
     type (str): The type of the request (options: ['get', 'post', 'options'])
+    body (dict): Optional body of a post request
+    limit (bool): Defines if the request should wait for the rate limiter (False if the caller already acquired it)
   '''
-  # select correct type
   type = type.lower()
+  # check the response cache
+  store = cache.get_cache() if type == 'get' else None
+  headers = {}
+  if store is not None:
+    hit, data = store.lookup(url)
+    if hit:
+      return data
+    headers = store.headers(url)
+
+  if limit:
+    ratelimit.acquire('fmp')
+  # select correct type
+  session = get_session()
   if type == 'get':
-    res = requests.get(url)
+    res = session.get(url, headers=headers, timeout=TIMEOUT)
   elif type == 'post':
-    res = requests.post(url, data=json.dump(body))
+    res = session.post(url, data=json.dumps(body), timeout=TIMEOUT)
   elif type == 'options':
-    res = requests.options(url)
+    res = session.options(url, timeout=TIMEOUT)
+  else:
+    raise ValueError("Unkown request type ({})".format(type))
 
   # execute command
-  return res.json()
+  if store is not None and res.status_code == 304:
+    return store.touch(url)
+  res.raise_for_status()
+  data = res.json()
+  if store is not None:
+    store.put(url, data, res.headers)
+  return data
+
+def fetch_records(url, key=None, chunk_size=1 << 16):
+  '''Fetches a (large) list response from the API and parses its elements incrementally.
+
+  If the response cache is enabled, the complete response is fetched through `fetch` instead.
+
+  Args:
+    url (str): The url of data to retrieve
+    key (str): Name of the key that holds the list in the response (if None the response is a list)
+    chunk_size (int): Number of bytes to read from the network at once
+
+  Returns:
+    Generator of the parsed records
+  '''
+  if cache.get_cache() is not None:
+    data = fetch(url)
+    yield from (data if key is None else data[key])
+    return
+
+  ratelimit.acquire('fmp')
+  with get_session().get(url, timeout=TIMEOUT, stream=True) as res:
+    res.raise_for_status()
+    yield from parse.iter_records(res.iter_content(chunk_size=chunk_size), key)
 
 def convert_dtype(df, dtype, non_cols=None):
   '''Converts the dtype except the given columns.
@@ -20,7 +20,8 @@ nltk.download('maxent_ne_chunker')
 nltk.download('words')
 nltk.download('omw')
 
-from recommender.stocks import AlphaVantageTicker, FMPStatements
+from recommender.stocks import AlphaVantageTicker, FMPStatements, PricePanel, StatementIndex
+from recommender import utils
 
 
 def normalize_stock_array(arr):
@@ -62,78 +63,160 @@ def normalize_stock_window(arr, days_back, days_target, smooth_interval):
   # return result vector
   return np.concatenate([vals, [norm, target]])
 
-def create_stock_dataset(df, days_back, days_target, smooth_interval, value_col='close', jump_size=7):
-    '''Creates a dataset from the given stock data.
+def normalize_stock_windows(wnds, days_back, days_target, smooth_interval):
+  '''Vectorized version of `normalize_stock_window` that normalizes all windows of a window matrix at once.
+
+  Args:
+    wnds (np.Array): 2D Numpy Array with one window per row
+    days_back (int): How many days of history data should be included
+    days_target (int): How many days shoudl the target value lie ahead
+    smooth_interval (int): Interval in days around the target value that is used for smoothing (if None use just target day)
+
+  Returns:
+    2D Numpy array with `days_back` normalized values, the norm value and the target value per row
+  '''
+  # retrieve the normalized data
+  norm = wnds[:, days_back - 1].astype('float64')
+  arr = np.divide(wnds, norm[:, None], dtype='float64') - 1
+
+  # calculate the target value
+  target_loc = days_back + days_target - 1
+  if smooth_interval is None:
+    target = arr[:, target_loc]
+  else:
+    target = arr[:, (target_loc - smooth_interval):(target_loc + smooth_interval + 1)].mean(axis=1)
+
+  # return result matrix
+  return np.column_stack([arr[:, :days_back], norm, target])
+
+def create_panel_dataset(panel, days_back, days_target, smooth_interval, jump_size=7):
+    '''Creates a dataset from the given price panel.
+
+    Windows are taken over the days that contain data for each symbol (same as for a per-symbol DataFrame), so gaps of a
+    symbol on the shared trading-day axis (`NaN` values) do not drop windows. Rows without gaps are used as views on the
+    panel, only rows with gaps are compacted into a copy.
 
     Args:
-        df (DataFrame): DataFrame of stock prices. Each Row should contain these columns: `[symbol, date, values]`
-        value_col (str): Name of the column that contains the relevant stock data
+        panel (PricePanel): Panel of stock prices (e.g. from `Cache.load_panel`)
         days_back (int): How many days of history data should be included
         days_target (int): How many days shoudl the target value lie ahead
         smooth_interval (int): Interval in days around the target value that is used for smoothing
         jump_size (int): Number of days to jump between different data points
 
     Returns:
-        DataFrame that should contain the relevant stock information. It contains the following columns: `[date, *data, norm_value, target, symbol]`.
-        `date` is thereby the starting date before the prediction.
-        `norm_value` is the dollar value of the stock used as normalization point (from date+days_back)
-        `data` are a list of columns from newest to oldest (number is defined by `days_back`)
-           |------------------|----------------------------|
-         date    data    date+days_back                 target
+        DataFrame in the same format as `create_stock_dataset`
     '''
     # safty checks
     if jump_size < 1:
       raise ValueError("Value `jump_size` may not be smaller than 1 (current value: {})".format(jump_size))
-    if value_col not in df.columns:
-      raise ValueError("The provided value column ({}) does not exist in the given dataframe".format(value_col))
-
-    # iterate through all symbols in the df
-    symbols = df['symbol'].unique()
-    # make sure that date column is converted
-    if df['date'].dtype == 'object':
-      # replace relevant time patterns
-      pattern = '(?P<date>[0-9]+-[0-9]+-[0-9]+)([ ]*(?P<time>[0-9]+:[0-9]+:[0-9]+)(Z|-?\+?[0-9]+(:[0-9]+)?)?)?'
-      repl = lambda m: "{} {}".format(m.group('date'), '00:00:00' if m.group('time') is None else m.group('time'))
-      df['date'] = df['date'].str.replace(pattern, repl, regex=True).apply(lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S"))
 
     # calculate window size and the column names
     win = days_back + days_target + (smooth_interval if smooth_interval is not None else 0)
     cols = ["day_{}".format(i+1) for i in range(days_back)] + ["norm_price", "target"]
 
-    # order symbol-df for time and perform sliding window
-    df_symbol = df['symbol'].str.lower()
+    # perform sliding window on each panel row
     df_norm = []
-    for symbol in symbols:
-        # retrieve partial df
-        df_sym = df[df_symbol == symbol.lower()].sort_values(by='date').set_index('date')[[value_col]]
-        # note: use copy to ensure memory safty for as_strided function
-        df_arr = np.copy(df_sym.to_numpy())
-
-        # sliding window (Note: pandas does not write a new array to disk, but references the old one, as long as no values are modified)
-        st = df_arr.strides   # number of bytes for as_stride to jump
-        sz = np.ceil((len(df_arr) - (win-1)) / jump_size)
+    for i, symbol in enumerate(panel.symbols):
+        # retrieve the days of the row that contain data
+        valid = ~np.isnan(panel.values[i])
+        days = np.flatnonzero(valid)
+        if len(days) == 0: continue
+        first, last = days[0], days[-1]
+        if last - first + 1 == len(days):
+          # note: the row is a view on the panel, as_strided does not copy the data
+          row = panel.values[i, first:last + 1]
+          dates = panel.dates[first:last + 1]
+        else:
+          # compact the gaps of the symbol
+          row = np.ascontiguousarray(panel.values[i][valid])
+          dates = panel.dates[valid]
+
+        # sliding window
+        st = row.strides   # number of bytes for as_stride to jump
+        sz = int(np.ceil((len(row) - (win-1)) / jump_size))
         # make sure that we have minimum requried data
         if sz <= 0: continue
         # note: as_strided works directly on memory blocks and might crash the program
-        wnds = as_strided(df_arr, (int(sz), win), (st[0] * jump_size, st[1] * 1), writeable=False)
+        wnds = as_strided(row, (sz, win), (st[0] * jump_size, st[0] * 1), writeable=False)
 
         # apply normalization
-        df_res = np.apply_along_axis(lambda wnd: normalize_stock_window(wnd, days_back, days_target, smooth_interval), axis=1, arr=wnds)
-        df_res = pd.DataFrame(df_res)
+        res = normalize_stock_windows(wnds, days_back, days_target, smooth_interval)
 
         # add columns and index
-        df_res.columns = cols
-        df_res.index = df_sym.index[:-(win-1)][0::jump_size]
+        df_res = pd.DataFrame(res, columns=cols, index=dates[:sz * jump_size:jump_size])
+        df_res.index.name = 'date'
         df_res['symbol'] = symbol
 
         # add to result
         df_norm.append(df_res)
 
     # add data to target
+    if len(df_norm) == 0:
+      return pd.DataFrame(columns=cols + ['symbol'])
     df_norm = pd.concat(df_norm, axis=0)
 
     return df_norm
 
+def create_stock_dataset(df, days_back, days_target, smooth_interval, value_col='close', jump_size=7):
+    '''Creates a dataset from the given stock data.
+
+    Args:
+        df (DataFrame): DataFrame of stock prices. Each Row should contain these columns: `[symbol, date, values]` (can also be a `PricePanel`)
+        value_col (str): Name of the column that contains the relevant stock data
+        days_back (int): How many days of history data should be included
+        days_target (int): How many days shoudl the target value lie ahead
+        smooth_interval (int): Interval in days around the target value that is used for smoothing
+        jump_size (int): Number of days to jump between different data points
+
+    Returns:
+        DataFrame that should contain the relevant stock information. It contains the following columns: `[date, *data, norm_value, target, symbol]`.
+        `date` is thereby the starting date before the prediction.
+        `norm_value` is the dollar value of the stock used as normalization point (from date+days_back)
+        `data` are a list of columns from newest to oldest (number is defined by `days_back`)
+           |------------------|----------------------------|
+         date    data    date+days_back                 target
+    '''
+    # check if panel is already given
+    if isinstance(df, PricePanel):
+      return create_panel_dataset(df, days_back, days_target, smooth_interval, jump_size=jump_size)
+
+    # safty checks
+    if value_col not in df.columns:
+      raise ValueError("The provided value column ({}) does not exist in the given dataframe".format(value_col))
+
+    # make sure that date column is converted
+    if df['date'].dtype == 'object':
+      # replace relevant time patterns
+      pattern = '(?P<date>[0-9]+-[0-9]+-[0-9]+)([ ]*(?P<time>[0-9]+:[0-9]+:[0-9]+)(Z|-?\+?[0-9]+(:[0-9]+)?)?)?'
+      repl = lambda m: "{} {}".format(m.group('date'), '00:00:00' if m.group('time') is None else m.group('time'))
+      df['date'] = df['date'].str.replace(pattern, repl, regex=True).apply(lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S"))
+
+    # align all symbols in a panel (single pass over the data)
+    panel = PricePanel.from_frame(df, value_col)
+
+    return create_panel_dataset(panel, days_back, days_target, smooth_interval, jump_size=jump_size)
+
+def iter_stock_dataset(data, days_back, days_target, smooth_interval, value_col='close', jump_size=7, chunk_size=500):
+    '''Creates the stock dataset in chunks to process large universes with bounded memory.
+
+    Args:
+        data: Either a `PricePanel` (processed in chunks of `chunk_size` symbols) or an iterable of DataFrames (e.g. from `Cache.iter_stock_data`)
+        days_back (int): How many days of history data should be included
+        days_target (int): How many days shoudl the target value lie ahead
+        smooth_interval (int): Interval in days around the target value that is used for smoothing
+        value_col (str): Name of the column that contains the relevant stock data
+        jump_size (int): Number of days to jump between different data points
+        chunk_size (int): Number of symbols per chunk (only used for panels)
+
+    Returns:
+        Generator of DataFrames in the format of `create_stock_dataset`
+    '''
+    chunks = data.chunks(chunk_size) if isinstance(data, PricePanel) else data
+    for chunk in chunks:
+      df = create_stock_dataset(chunk, days_back, days_target, smooth_interval, value_col=value_col, jump_size=jump_size)
+      if not df.empty:
+        yield df
+
 def categorize_stock_data(df, xlim, num_cats=6, debug=True):
   '''Performs categorization of the target values in the data.
 
@@ -285,12 +368,40 @@ def normalize_statement_data(df, impute=False, impute_heavy=False, impute_method
 
   return df
 
+def create_statement_index(df, impute=True, impute_heavy=False):
+  '''Normalizes the given statements (see `normalize_statement_data`) and builds the as-of index for `merge_stock_statement`.
+
+  Args:
+    df (DataFrame): DataFrame with merged statement informations for each company
+    impute (bool): Defines if missing values should be imputed to create a stable dataset
+    impute_heavy (bool): Defines if forward imputing should also be used to avoid NaN values
+
+  Returns:
+    `StatementIndex` over the normalized statements
+  '''
+  return StatementIndex(normalize_statement_data(df, impute=impute, impute_heavy=impute_heavy))
+
+def load_statement_index(cache, period='quarter', rebuild=False):
+  '''Retrieves the persisted as-of index over all normalized statements of the cache (imputed as in `create_dataset`).
+
+  Args:
+    cache (Cache): Instance of the cache that holds the statements
+    period (str): Period of the statements (options: 'quarter', 'annual')
+    rebuild (bool): Defines if the index should be rebuilt
+
+  Returns:
+    `StatementIndex` (or None if no statements are cached)
+  '''
+  return cache.statement_index(period, rebuild=rebuild, transform=lambda df: normalize_statement_data(df, impute=True), name='norm')
+
 def merge_stock_statement(df_stocks, df_stmnts, col_price='price', clean_na=True, drop_last_day=True):
   '''Merges the given stock and statement data
 
+  Statements are joined through a point-in-time index (latest statement at most 365 days before the end of the window).
+
   Args:
     df_stocks (DataFrame):
-    df_stmnts (DataFrame):
+    df_stmnts (DataFrame or StatementIndex): Normalized statement data (or a prebuilt index, see `create_statement_index`)
     col_price (str): Name of the column in `df_stocks` that holds the price
     clean_na (bool): Defines if columns with any NaN values should be cleared
     drop_last_day (bool): Defines if the column with the last day information should be dropped (as it is 0)
@@ -303,16 +414,16 @@ def merge_stock_statement(df_stocks, df_stmnts, col_price='price', clean_na=True
 
   # make sure symbols are upper case
   df_stocks['symbol'] = df_stocks['symbol'].str.upper()
-  df_stmnts['symbol'] = df_stmnts['symbol'].str.upper()
+  index = df_stmnts if isinstance(df_stmnts, StatementIndex) else StatementIndex(df_stmnts)
 
   # merge data (note: use values at the end - as pandas matches index otherwise...)
   df_stocks['date_cor'] = (df_stocks.reset_index()['date'] + pd.DateOffset(days_back)).values
-  df = pd.merge_asof(
-      df_stocks.reset_index().sort_values(by=['date_cor', 'symbol']),
-      df_stmnts.reset_index().sort_values(by=['date', 'symbol']),
-      left_on='date_cor', right_on='date', by='symbol',
-      tolerance=pd.Timedelta('365 day'), direction='backward'
-  )
+  df_left = df_stocks.reset_index().sort_values(by=['date_cor', 'symbol']).reset_index(drop=True)
+  df_right = index.asof(df_left['symbol'].values, df_left['date_cor'].values, tolerance=365)
+  df = pd.concat([
+      df_left.rename(columns={'date': 'date_x'}),
+      df_right.drop(['symbol'], axis=1).rename(columns={'date': 'date_y'})
+  ], axis=1)
 
   # calculate the pe_ratio
   df['pe_ratio'] = np.divide(df[col_price], df['eps_diluted'])
@@ -357,9 +468,12 @@ def create_dataset(symbols, stocks, cache, back, ahead, xlim, num_cats=6, jump_s
   Returns:
     Merged final dataset with training data points
   '''
-  # load relevant statements
+  # load relevant statements (and index the normalized statements once)
   if sm is None: sm = FMPStatements()
   df_state = cache.load_statement_data(symbols, sm, limit=True)
+  index = load_statement_index(cache, getattr(sm, 'period', 'quarter'))
+  if index is None:
+    index = create_statement_index(df_state, impute=True)
 
   # load relevant stocks
   if ti is None: ti = AlphaVantageTicker()
@@ -368,15 +482,54 @@ def create_dataset(symbols, stocks, cache, back, ahead, xlim, num_cats=6, jump_s
   # preprocess the data
   df_norm = create_stock_dataset(df_stocks, back, ahead, smooth, jump_size=jump_size)
   df_stocks_cat = categorize_stock_data(df_norm, xlim=xlim, num_cats=num_cats)
-  df_state_norm = normalize_statement_data(df_state, impute=True)
-  return merge_stock_statement(df_stocks_cat, df_state_norm, col_price='norm_price')
+  return merge_stock_statement(df_stocks_cat, index, col_price='norm_price')
+
+def iter_dataset(symbols, stocks, cache, back, ahead, xlim, num_cats=6, jump_size=21, smooth=5, sm=None, ti=None, chunk_size=500):
+  '''Creates the complete dataset in chunks of symbols (see `create_dataset`) to process large universes with bounded memory.
+
+  Args:
+    symbols (list): List of symbol names to include in the dataset
+    stocks (dict): Dict with additional stock file mapping
+    cache (Cache): Instance of the cache to load the data
+    back (int): Number of days of historic stock data in the dataset
+    ahead (int): Number of days the target value lies in the future
+    xlim (tuple): Float Tuple of values to limit percentage (keep in mind, that a stock cannot fall below -1)
+    num_cats (int): Number of categories to generate
+    jump_size (int): Size of the jump in days between datapoints
+    smooth (int): Interval of smoothing days around the target value
+    sm (Statement): Instance of Statement to load data not in cache (if None use FMPStatements)
+    ti (Ticker): Instance of Ticker to load data not in cahce (if None use AlphaVantageTicker)
+    chunk_size (int): Number of symbols per chunk
+
+  Returns:
+    Generator of merged dataset chunks
+  '''
+  if sm is None: sm = FMPStatements()
+  if ti is None: ti = AlphaVantageTicker()
+
+  # make sure that the statements of all chunks are cached and index them once
+  for chunk in utils.parallel.chunks(symbols, chunk_size):
+    cache.load_statement_data(chunk, sm, limit=True)
+  index = load_statement_index(cache, getattr(sm, 'period', 'quarter'))
+  if index is None: return
+
+  for chunk in utils.parallel.chunks(symbols, chunk_size):
+    # load the stock data of the chunk
+    df_stocks = cache.load_stock_data(chunk, stocks, ti)
+    if df_stocks is None or df_stocks.empty: continue
+
+    # preprocess the data
+    df_norm = create_stock_dataset(df_stocks, back, ahead, smooth, jump_size=jump_size)
+    if df_norm.empty: continue
+    df_stocks_cat = categorize_stock_data(df_norm, xlim=xlim, num_cats=num_cats, debug=False)
+    yield merge_stock_statement(df_stocks_cat, index, col_price='norm_price')
 
 def create_input(df_stocks, df_state, back, value_col='close'):
   '''Creates an input datapoint for each given symbol.
 
   Args:
     df_stocks (DataFrame): List of stock data (already loaded) that should be used
-    df_state (DataFrame): List of statement data that should be used
+    df_state (DataFrame): List of statement data that should be used (or a prebuilt index, see `create_statement_index`)
     num_cats (int): Number of categories for the data
     back (int): Days of historic data to use
     value_col (str): Column that contains the relevant price information
@@ -385,33 +538,34 @@ def create_input(df_stocks, df_state, back, value_col='close'):
     Dataframe with one datapoint per symbol to be inputed into a prediction model
   '''
   # create statement data
-  df_state_norm = normalize_statement_data(df_state, impute=True, impute_heavy=True)
+  index = df_state if isinstance(df_state, StatementIndex) else create_statement_index(df_state, impute=True, impute_heavy=True)
 
   # setup stocks data
   if df_stocks['date'].dtype == 'object':
       df_stocks['date'] = df_stocks['date'].apply(lambda x: datetime.strptime(x, "%Y-%m-%d"))
 
-  # iterate through all symbols in stock data and find relevant items
-  symbols = df_stocks['symbol'].unique()
+  # align all symbols in a panel (single pass over the data)
+  panel = PricePanel.from_frame(df_stocks, value_col)
   df_norm = []
-  for symbol in symbols:
-    # retrieve partial df
-    df_sym = df_stocks[df_stocks['symbol'] == symbol].sort_values(by='date', ascending=False).set_index('date')[[value_col]]
-    # note: use copy to ensure memory safty for as_strided function
-    df_arr = np.copy(df_sym.to_numpy())
-
-    # sliding window (Note: pandas does not write a new array to disk, but references the old one, as long as no values are modified)
-    st = df_arr.strides   # number of bytes for as_stride to jump
-    # note: as_strided works directly on memory blocks and might crash the program
-    wnds = as_strided(df_arr, (1, back), (st[0] * 1, st[1] * 1), writeable=False)
+  for i, symbol in enumerate(panel.symbols):
+    # retrieve the latest window of the row (skip days without data)
+    rng = panel.valid_range(i)
+    if rng is None: continue
+    last = rng[1]
+    arr = panel.values[i, max(0, last - back + 1):last + 1]
+    if len(arr) < back or np.isnan(arr).any():
+      # compact the gaps of the symbol (as in `create_panel_dataset`)
+      row = panel.values[i, :last + 1]
+      arr = row[~np.isnan(row)][-back:]
+    if len(arr) < back: continue
 
     # normalize the one window
-    df_res = np.apply_along_axis(lambda wnd: normalize_stock_array(wnd[::-1]), axis=1, arr=wnds)
-    df_res = pd.DataFrame(df_res)
-    df_res.columns = ["day_{}".format(i+1) for i in range(back)]
-    df_res.index = df_sym.index[:-(back-1)][0:1]
+    df_res = pd.DataFrame(normalize_stock_array(arr.astype('float64'))[None, :])
+    df_res.columns = ["day_{}".format(j+1) for j in range(back)]
+    df_res.index = panel.dates[last:last + 1]
+    df_res.index.name = 'date'
     df_res['symbol'] = symbol
-    df_res['norm_price'] = wnds[0][0]
+    df_res['norm_price'] = arr[-1]
 
     df_norm.append(df_res)
 
@@ -419,7 +573,7 @@ def create_input(df_stocks, df_state, back, value_col='close'):
   df_norm = pd.concat(df_norm, axis=0)
 
   # combine datasets
-  df_res = merge_stock_statement(df_norm, df_state_norm, col_price='norm_price', clean_na=False)
+  df_res = merge_stock_statement(df_norm, index, col_price='norm_price', clean_na=False)
   # cleanup dataframe
   df_res = df_res.fillna(0)
   return df_res
@@ -8,9 +8,51 @@ from .Ticker import Ticker, TickerResolution, TickerGranularity
 from recommender import utils
 
 from datetime import datetime
+import numpy as np
+import pandas as pd
 import pytz
+import time
+import threading
 import re
 
+# number of calendar days that are covered by the `compact` output (100 trading days)
+COMPACT_DAYS = 130
+# aggregation of the price columns when resampling bars
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+# regular trading session (local time of the exchange)
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_CLOSE = pd.Timedelta(hours=16)
+
+
+def resample_bars(df, minutes):
+  '''Aggregates intraday bars into bars of the given number of minutes (vectorized).
+
+  Bars are labeled by their end time (as the bars of the api, e.g. 09:31 to 16:00 for 1min bars) and the intervals are
+  anchored at the session open, so a 45min bar labeled 10:15 aggregates the 1min bars 09:31 to 10:15. The last bar of
+  the session ends at the close (e.g. 15:30 to 16:00 for 60min bars).
+
+  Args:
+    df (DataFrame): Bars with a `pd.DatetimeIndex` and columns `open`, `high`, `low`, `close`, `volume`
+    minutes (int): Length of the resulting bars in minutes
+
+  Returns:
+    DataFrame of the aggregated bars (intervals without data are dropped)
+  '''
+  agg = dict((col, fct) for col, fct in OHLCV_AGG.items() if col in df.columns)
+  df = df.sort_index()
+  # compute the end of the interval of each bar relative to the session open of its day
+  day = df.index.normalize()
+  session_open = day + SESSION_OPEN
+  session_close = day + SESSION_CLOSE
+  offset = np.ceil((df.index - session_open) / pd.Timedelta(minutes=minutes))
+  ends = session_open + pd.to_timedelta(offset * minutes, unit='m')
+  # note: the last interval of the session is cut at the close
+  ends = ends.where(~((df.index <= session_close) & (ends > session_close)), session_close)
+  res = df.groupby(ends).agg(agg)
+  res.index.name = df.index.name
+  return res.dropna(subset=['close'] if 'close' in agg else None, how='all')
+
+
 class AlphaVantageTicker(Ticker):
   '''Ticker implementation for the Alpha-Vantage API.
 
@@ -20,11 +62,14 @@ class AlphaVantageTicker(Ticker):
     data = ticker.historic('MSFT', start=None)
     ```
 
+  Intraday resolutions are derived locally from 1min bars, which are fetched once per symbol and kept for `cache_ttl` seconds.
+
   Args:
     key: `str` key for the alpha vantage API (if None try to load through `utils.read_keys()`)
     outputsize: `str` of either `full` or `compact` that defines the return values from the API.
+    cache_ttl: `float` number of seconds the fetched 1min bars are reused for other intraday resolutions.
   '''
-  def __init__(self, key=None, outputsize='full'):
+  def __init__(self, key=None, outputsize='full', cache_ttl=60):
     # check if key should be updated
     if key is None:
       key = utils.read_keys()['alphavantage']
@@ -32,6 +77,10 @@ class AlphaVantageTicker(Ticker):
     self.__key = key
     self.ts = TimeSeries(key=self.__key, output_format='pandas')
     self._out = outputsize
+    self.cache_ttl = cache_ttl
+    self._bars = {}
+    self._bars_lock = threading.Lock()
+    self._flight = utils.parallel.SingleFlight()
 
   def price(self, symbol):
     '''Retrieves the current price of the given stock.
@@ -43,6 +92,7 @@ class AlphaVantageTicker(Ticker):
       `dict` that contains open, close, volume, high, low, timestamp
     '''
     # retrieve the data
+    utils.ratelimit.acquire('alphavantage')
     data, meta_data = self.ts.get_intraday(symbol, interval='1min', outputsize='compact')
     price = data[-1:]
 
@@ -77,6 +127,60 @@ class AlphaVantageTicker(Ticker):
     Returns:
       `pd.dataframe` with a `pd.DatetimeIndex` and columns `open`, `close`, `low`, `high`, `volume`.
     '''
+    return self._historic(symbol, start, end, resolution, self._out)
+
+  def historic_tail(self, symbol, since, resolution='daily'):
+    '''Retrieves the latest bars starting from the given date.
+
+    Uses the `compact` output of the API if the bars since the given date are covered by it.
+
+    Args:
+      symbol: `str` of the symbol name
+      since: `datetime` of the last known bar
+      resolution: `TickerResolution` or `str` on the resolution of the data.
+
+    Returns:
+      `pd.dataframe` in the same format as `historic` (might include bars before `since`)
+    '''
+    since = pd.Timestamp(since)
+    if since.tzinfo is not None:
+      since = since.tz_localize(None)
+    outputsize = 'compact' if (pd.Timestamp.now() - since).days < COMPACT_DAYS else self._out
+    return self._historic(symbol, None, None, resolution, outputsize)
+
+  def _format(self, data, md):
+    '''Renames the columns and localizes the index of the api data (vectorized).'''
+    tz = pytz.timezone(md[self.__search_key(md, "Time Zone")])
+    data = data.rename(columns={'1. open':'open', '2. high':'high', '3. low':'low', '4. close': 'close', '5. volume': 'volume'})
+    data.index = pd.DatetimeIndex(data.index).tz_localize(tz)
+    return data.sort_index()
+
+  def _minute_bars(self, symbol, outputsize):
+    '''Retrieves the 1min bars of the symbol (from the api or the local cache).'''
+    key = (symbol.upper(), outputsize)
+    with self._bars_lock:
+      # drop expired bars (so only recently requested symbols are kept in memory)
+      now = time.monotonic()
+      for old in [k for k, entry in self._bars.items() if now - entry[0] >= self.cache_ttl]:
+        del self._bars[old]
+      entry = self._bars.get(key)
+      # note: full output also covers compact requests
+      if entry is None and outputsize == 'compact':
+        entry = self._bars.get((symbol.upper(), 'full'))
+    if entry is not None:
+      return entry[1]
+
+    def fetch():
+      utils.ratelimit.acquire('alphavantage')
+      data, md = self.ts.get_intraday(symbol, interval='1min', outputsize=outputsize)
+      data = self._format(data, md)
+      with self._bars_lock:
+        self._bars[key] = (time.monotonic(), data)
+      return data
+    return self._flight.do(key, fetch)
+
+  def _historic(self, symbol, start, end, resolution, outputsize):
+    '''Retrieves the historic prices with the given outputsize (see `historic`).'''
     # safty: covnert input data
     start = utils.safe_datetime(start)
     end = utils.safe_datetime(end)
@@ -87,14 +191,22 @@ class AlphaVantageTicker(Ticker):
     # handle resolution
     if isinstance(resolution, str):
       resolution = TickerResolution.from_string(resolution)
-    time_format = '%Y-%m-%d'
 
     # check for correct granularity
+    if resolution.granularity == TickerGranularity.INTRADAY:
+      # derive the resolution from the 1min bars
+      data = self._minute_bars(symbol, outputsize)
+      if resolution.min_interval > 1:
+        data = resample_bars(data, resolution.min_interval)
+      return self._filter(data, start, end)
+
+    # wait for the api budget
+    utils.ratelimit.acquire('alphavantage')
     if resolution.granularity == TickerGranularity.DAILY:
       if resolution.adjusted:
-        data, md = self.ts.get_daily_adjusted(symbol, outputsize=self._out)
+        data, md = self.ts.get_daily_adjusted(symbol, outputsize=outputsize)
       else:
-        data, md = self.ts.get_daily(symbol, outputsize=self._out)
+        data, md = self.ts.get_daily(symbol, outputsize=outputsize)
     elif resolution.granularity == TickerGranularity.WEEKLY:
       if resolution.adjusted:
         data, md = self.ts.get_weekly_adjusted(symbol)
@@ -105,23 +217,11 @@ class AlphaVantageTicker(Ticker):
         data, md = self.ts.get_monthly_adjusted(symbol)
       else:
         data, md = self.ts.get_monthly(symbol)
-    else:
-      # retrieve number closed to predef minute intervals
-      mins = utils.math.take_smallest_closest(resolution.min_interval, [1,5,15,30,60])
-      time_format = '%Y-%m-%d %H:%M:%S'
-      # retrieve the data
-      data, md = self.ts.get_intraday(symbol, interval="{}min".format(mins), outputsize=self._out)
-      # TODO: filter the data in pandas (according to actual resolution data)
-
-    # format the data
-    tz = pytz.timezone(md[self.__search_key(md, "Time Zone")])
-    data.rename(columns={'1. open':'open', '2. high':'high', '3. low':'low', '4. close': 'close', '5. volume': 'volume'}, inplace=True)
-    data.index = data.index.map( lambda x:tz.localize( x ) )
 
-    # filter on the given time series
-    if end is not None:
-      data = data.loc[start:end]
-    else:
-      data = data.loc[start:]
+    return self._filter(self._format(data, md), start, end)
 
-    return data
+  def _filter(self, data, start, end):
+    '''Filters the data on the given time range.'''
+    if end is not None:
+      return data.loc[start:end]
+    return data.loc[start:]
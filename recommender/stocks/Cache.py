@@ -2,38 +2,136 @@
 
 import os, warnings
 import glob
+import functools
 import pandas as pd
 import numpy as np
 from .AlphaVantageTicker import AlphaVantageTicker
+from .PriceStore import PriceStore, format_prices, filter_prices, read_partition
+from .Manifest import Manifest
+from .NegativeCache import NegativeCache, classify_error
+from .PricePanel import PricePanel
+from .StatementStore import StatementStore
+from .StatementIndex import StatementIndex
 from recommender.contrib import fmp_api
+from recommender import utils
+
+
+def _read_stock(file, columns=None, start=None, end=None):
+  '''Reads the price data from a store partition or a csv file (used as picklable function for process pools).'''
+  if file.endswith('.parquet'):
+    return read_partition(file, columns, start, end)
+  return filter_prices(format_prices(pd.read_csv(file)), columns, start, end)
+
+def _csv_stats(file):
+  '''Retrieves the number of rows and the first and last date of a sorted csv price file (kaggle layout).'''
+  with open(file, 'rb') as f:
+    lines = [line for line in f.read().splitlines()[1:] if len(line.strip()) > 0]
+  if len(lines) == 0:
+    return 0, None, None
+  date = lambda line: pd.Timestamp(line.split(b',')[0].decode())
+  return len(lines), date(lines[0]), date(lines[-1])
+
+def _first_transient(errors):
+  '''Retrieves the first transient error of the given errors (or the first error if none is transient).'''
+  errors = list(errors)
+  return next((error for error in errors if classify_error(error) == 'transient'), errors[0])
 
 class Cache():
   '''Cache Function that stores stock and statement data on disk and loads it if required.
 
+  Symbols that failed to load from the APIs are recorded in `Cache.failures` (see `NegativeCache`) and skipped until their failure expires.
+
   Args:
     cache_folder (str): Folder to store the cache data into
   '''
   def __init__(self, cache_folder='../data'):
     self.path = cache_folder
+    self.errors = {}
+    self.failures = NegativeCache(os.path.join(self.path, 'failures.json'))
+    self._manifests = {}
+    self.prices = {
+      'stock': PriceStore(os.path.join(self.path, 'Prices', 'Stocks')),
+      'etf': PriceStore(os.path.join(self.path, 'Prices', 'ETFs'))
+    }
+
+  def manifest(self, type='stock', rebuild=False):
+    '''Retrieves the persisted manifest of the csv price files (kaggle `.txt` layout) for the given data type.
+
+    The manifest is created on first use and only updated for new or changed files if `rebuild` is set.
+
+    Args:
+      type (str): type of data (options: 'stock', 'etf')
+      rebuild (bool): Defines if the folder should be scanned for new, changed or removed files
 
-  def list_data(self, type='stock'):
+    Returns:
+      `Manifest` of the csv files
+    '''
+    if type not in ['stock', 'etf']:
+      raise ValueError("Unkown type ({})".format(type))
+    fldr = 'Stocks' if type == 'stock' else 'ETFs'
+    if type not in self._manifests:
+      self._manifests[type] = Manifest(os.path.join(self.path, fldr, 'manifest.jsonl'))
+    manifest = self._manifests[type]
+
+    # scan the folder
+    if rebuild or not manifest.exists():
+      files = glob.glob(os.path.join(self.path, fldr, '*.txt'))
+      if len(files) == 0 and not manifest.exists():
+        return manifest
+      names = [os.path.basename(f).split('.')[0] for f in files]
+      for symbol in set(manifest.symbols()).difference(names):
+        manifest.remove(symbol, save=False)
+      for symbol, file in zip(names, files):
+        entry = manifest.get(symbol)
+        if entry is not None and entry['path'] == file and entry['size'] == os.path.getsize(file):
+          continue
+        rows, first, last = _csv_stats(file)
+        manifest.update(symbol, file, rows, first, last, save=False)
+      manifest.compact()
+
+    return manifest
+
+  def list_data(self, type='stock', rebuild=False):
     '''Generates a list of available symbols for the given data type in cache.
 
+    The list is answered from the persisted manifests of the csv files and the price store.
+
     Args:
       type (str): type of data to retrieve (options: 'stock', 'etf', 'statement')
+      rebuild (bool): Defines if the csv folder should be scanned for new files (see `manifest`)
+
+    Returns:
+      Dictionary of symbol names to files
     '''
     # safty check
     if type not in ['stock', 'etf', 'statement']:
       raise ValueError("Unkown type ({})".format(type))
-    # set folder
-    fldr = 'Stocks' if type == 'stock' else 'ETFs'
-    path = os.path.join(self.path, fldr, '*.txt')
-    # list all fiels in direcotry
-    files = glob.glob(path)
-    names = pd.Series(files).apply(lambda f: os.path.basename(f).split('.')[0])
+    if type == 'statement':
+      store = self.statement_store()
+      return dict((symbol, store.file(symbol)) for symbol in store.symbols())
 
-    # create dict for search
-    return dict(zip(names, files))
+    # create dict for search (price store takes precedence)
+    files = self.manifest(type, rebuild).paths()
+    files.update(self.prices[type].manifest.paths())
+    return files
+
+  def has_data(self, symbol, start=None, end=None, type='stock'):
+    '''Checks if the cached history of the symbol covers the given window (without loading any data).
+
+    Args:
+      symbol (str): Name of the symbol
+      start (datetime): First date of the window (if None only check existence)
+      end (datetime): Last date of the window (if None only check existence)
+      type (str): type of data (options: 'stock', 'etf')
+
+    Returns:
+      `True` if the data is in the cache
+    '''
+    return self.prices[type].manifest.covers(symbol, start, end) or self.manifest(type).covers(symbol, start, end)
+
+  def filter_data(self, symbols, start=None, end=None, type='stock'):
+    '''Filters the given symbols to the ones whose cached history covers the given window (see `has_data`).'''
+    return [symbol for symbol in symbols if self.has_data(symbol, start, end, type)]
 
   def get_data(self, symbols, ticker=None, statement=None):
     '''Loads the relevant company data either from the Cache using the APIs.
@@ -48,39 +146,231 @@ class Cache():
     '''
     pass
 
-  def load_stock_data(self, symbols, stocks=None, ticker=None, cache=True, load_data=True):
+  def convert_stock_data(self, type='stock', remove=False):
+    '''Converts the csv price files of the given type (kaggle `.txt` layout) into the columnar price store.
+
+    This is a one-shot operation. Afterwards `load_stock_data` reads the data from the store.
+
+    Args:
+      type (str): type of data to convert (options: 'stock', 'etf')
+      remove (bool): Defines if the original csv files should be deleted after conversion
+
+    Returns:
+      List of symbols that could not be converted
+    '''
+    if type not in ['stock', 'etf']:
+      raise ValueError("Unkown type ({})".format(type))
+    failed = self.prices[type].convert(self.manifest(type, rebuild=True).paths(), remove=remove)
+    if remove: self.manifest(type, rebuild=True)
+    return failed
+
+  def _stock_file(self, symbol, stocks):
+    '''Retrieves the file of a single symbol from the price store or the csv files (in that order).'''
+    if self.prices['stock'].contains(symbol):
+      return self.prices['stock'].file(symbol)
+    return stocks[symbol]
+
+  def _read_stock(self, symbol, stocks, columns=None, start=None, end=None):
+    '''Reads the data of a single symbol from the price store or the csv files (in that order).'''
+    return _read_stock(self._stock_file(symbol, stocks), columns, start, end)
+
+  def _fetch_stock(self, symbol, ticker, cache=True, columns=None, start=None, end=None):
+    '''Loads the data of a single symbol through the ticker (and stores it in the price store if `cache` is set).'''
+    df_stock = format_prices(ticker.historic(symbol, start=None, resolution='daily'))
+    if df_stock.empty == True:
+      raise ValueError("No price data found for {}".format(symbol))
+    if cache == True:
+      self.prices['stock'].write(symbol, df_stock)
+    return filter_prices(df_stock, columns, start, end)
+
+  def iter_stock_data(self, symbols, chunk_size=100, **kwargs):
+    '''Loads the stock data in chunks of symbols to process the data with bounded memory.
+
+    Args:
+      symbols (list): List of symbol names to load
+      chunk_size (int): Maximal number of symbols per chunk
+      kwargs: Additional arguments passed to `load_stock_data`
+
+    Returns:
+      Generator of DataFrames in the format of `load_stock_data` (chunks without data are skipped)
+    '''
+    for chunk in utils.parallel.chunks(symbols, chunk_size):
+      with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='No relevant stock data found!')
+        df = self.load_stock_data(chunk, **kwargs)
+      if df is not None:
+        yield df
+
+  def iter_statement_data(self, symbols, statement, chunk_size=100, **kwargs):
+    '''Loads the statement data in chunks of symbols to process the data with bounded memory.
+
+    Args:
+      symbols (list): List of symbols to load
+      statement (Statement): Instance of statements to load online data (if None, no data can be loaded)
+      chunk_size (int): Maximal number of symbols per chunk
+      kwargs: Additional arguments passed to `load_statement_data` (`limit` is always set)
+
+    Returns:
+      Generator of DataFrames in the format of `load_statement_data` (chunks without data are skipped)
+    '''
+    kwargs['limit'] = True
+    for chunk in utils.parallel.chunks(symbols, chunk_size):
+      df = self.load_statement_data(chunk, statement, **kwargs)
+      if df is not None and df.empty == False:
+        yield df
+
+  def _skip_failures(self, symbols, scope):
+    '''Splits the symbols into symbols to load and symbols with an active failure in the negative cache.
+
+    Returns:
+      symbols (list): List of symbols to load
+      errors (dict): Dictionary of the skipped symbols to an exception that describes the cached failure
+    '''
+    errors = {}
+    for symbol in symbols:
+      entry = self.failures.get(symbol, scope)
+      if entry is not None:
+        errors[symbol] = ValueError("Skipped {} due to cached failure ({}) until {}".format(symbol, entry['error'], entry['expires']))
+    return [symbol for symbol in symbols if symbol not in errors], errors
+
+  def _fetch_statements(self, statement, symbols, workers=None):
+    '''Loads the statements of the given symbols with a single `merge_records` call and records failures in the negative cache.
+
+    Symbols that have no statements are recorded with the class of their errors in `Statements.errors` (e.g. network
+    errors are `transient`, see `classify_error`). Symbols without errors and statements are recorded as `not_found`.
+
+    Args:
+      statement (Statements): Instance of statements to load the data
+      symbols (list): List of symbols to load
+      workers (int): Number of concurrent requests (if None use the default of `merge_records`)
+
+    Returns:
+      data (dict): Dictionary of symbols to the loaded (non-empty) statements
+      errors (dict): Dictionary of symbols to the raised exceptions
+    '''
+    symbols, errors = self._skip_failures(symbols, 'statement')
+    if len(symbols) == 0:
+      return {}, errors
+
+    # load the data (note: `errors` of the instance are only valid directly after the call)
+    try:
+      with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        # note: only overwrite the default concurrency of the statements if requested
+        kwargs = {} if workers is None else {'workers': workers}
+        df = statement.merge_records(symbols, **kwargs)
+      fails = dict((symbol, _first_transient(kinds.values())) for symbol, kinds in getattr(statement, 'errors', {}).items() if len(kinds) > 0)
+    except Exception as e:
+      df, fails = pd.DataFrame(), dict((symbol, e) for symbol in symbols)
+
+    # split the data per symbol and record the failures
+    data = dict(iter(df.groupby('symbol', sort=False))) if df.empty == False else {}
+    for symbol in symbols:
+      if symbol in data:
+        continue
+      if symbol in fails:
+        errors[symbol] = fails[symbol]
+        self.failures.record(symbol, 'statement', fails[symbol], save=False)
+      else:
+        self.failures.record(symbol, 'statement', None, save=False)
+    if len(symbols) > len(data):
+      self.failures.save()
+
+    return data, errors
+
+  def _fetch_missing(self, fct, symbols, scope, workers=None, record_empty=True):
+    '''Loads the given symbols through the API function and records failures in the negative cache.
+
+    Symbols with an active failure in the negative cache are skipped without calling the API.
+
+    Args:
+      fct (function): Function that loads the data of a single symbol
+      symbols (list): List of symbols to load
+      scope (str): Type of the data (used as scope in the negative cache)
+      workers (int): Number of concurrent threads (if None load serially)
+      record_empty (bool): Defines if empty results should be recorded as `not_found` failures
+
+    Returns:
+      data (dict): Dictionary of symbols to the loaded (non-empty) data
+      errors (dict): Dictionary of symbols to the raised exceptions
+    '''
+    # skip symbols that failed before
+    symbols, errors = self._skip_failures(symbols, scope)
+
+    # load the data and record the failures
+    results, fails = utils.parallel.map_parallel(fct, symbols, workers, mode='thread')
+    data = {}
+    for i, symbol in enumerate(symbols):
+      if i in fails:
+        errors[symbol] = fails[i]
+        self.failures.record(symbol, scope, fails[i], save=False)
+      elif results[i] is None or results[i].empty == True:
+        if record_empty: self.failures.record(symbol, scope, None, save=False)
+      else:
+        data[symbol] = results[i]
+    if len(symbols) > len(data):
+      self.failures.save()
+
+    return data, errors
+
+  def load_stock_data(self, symbols, stocks=None, ticker=None, cache=True, load_data=True, columns=None, start=None, end=None, refresh=False, workers=None, require_coverage=False):
     '''Loads a dataframe with the given stock data.
 
+    Data is read from the columnar price store first and from the csv files listed in `stocks` second.
+    Only data that is found in neither is loaded through the `ticker`.
+    Symbols that could not be loaded are listed with their exception in `Cache.errors`.
+
     Args:
         symbols (list): List of symbol names to load
         stocks (dict): Stock name dictionary (if None, load with default vals)
+        ticker (Ticker): Instance of a ticker to load data not in cache (if None create AlphaVantage)
         cache (bool): Defines if not found data that is loaded from API should be cached for later use (default=True)
         load_data (bool): Defines if data should be loaded from cache
+        columns (list): List of value columns to load (if None load all)
+        start (datetime): First date to load (if None start from earliest)
+        end (datetime): Last date to load (if None load up to the latest)
+        refresh (bool): Defines if outdated symbols in the price store should be refreshed first (see `refresh_stock_data`)
+        workers (int): Number of concurrent workers (processes for cached data, threads for API calls - if None load serially)
+        require_coverage (bool): Defines if symbols whose cached history does not cover `start` to `end` should be skipped (no API calls are made)
 
     Returns:
         DataFrame in default stock format with additional symbol column
     '''
+    # skip symbols that can not cover the window
+    if require_coverage == True:
+        symbols = self.filter_data(symbols, start, end)
+
     # generate ticker data
     if stocks is None: stocks = self.list_data()
-    if ticker is None: ticker = AlphaVantageTicker()
-
-    # process data
+    # update outdated data in the store
+    if refresh == True and load_data == True:
+        self.refresh_stock_data([symbol for symbol in symbols if self.prices['stock'].contains(symbol)], ticker)
+
+    # split into cached and missing symbols
+    symbols = list(symbols)
+    cached = [symbol for symbol in symbols if load_data and (self.prices['stock'].contains(symbol) or symbol in stocks)]
+    cached_set = set(cached)
+    missing = [symbol for symbol in symbols if symbol not in cached_set]
+
+    # read cached data (cpu bound parsing) and load missing data (io bound api calls)
+    data, errors = utils.parallel.map_parallel(
+        functools.partial(_read_stock, columns=columns, start=start, end=end),
+        [self._stock_file(symbol, stocks) for symbol in cached], workers, mode='process')
+    loaded = dict(zip(cached, data))
+    self.errors = dict((cached[i], errors[i]) for i in errors)
+    if len(missing) > 0:
+        if ticker is None: ticker = AlphaVantageTicker()
+        fetch = functools.partial(self._fetch_stock, ticker=ticker, cache=cache, columns=columns, start=start, end=end)
+        data, errors = self._fetch_missing(fetch, missing, 'stock', workers, record_empty=False)
+        loaded.update(data)
+        self.errors.update(errors)
+    if len(self.errors) > 0:
+        warnings.warn('Could not load {} symbols (see `Cache.errors`)'.format(len(self.errors)))
+
+    # process data (in the order of the input)
     df_stocks = []
     for symbol in symbols:
-        # load stock data
-        if symbol in stocks and load_data:
-            try:
-                df_stock = pd.read_csv(stocks[symbol])
-            except:
-                continue
-        else:
-            try:
-                df_stock = ticker.historic(symbol, start=None, resolution='daily').reset_index()
-                # store it as filw
-                df_stock.to_csv(os.path.join(self.path, 'Stocks', '{}.txt'.format(symbol)))
-            except:
-                print('Could not load {}'.format(symbol))
-                continue
+        df_stock = loaded.get(symbol)
 
         # check if empty
         if df_stock is None or df_stock.empty == True:
@@ -88,7 +378,6 @@ class Cache():
 
         # post process data
         df_stock['symbol'] = symbol
-        df_stock.columns = [col.lower() for col in df_stock.columns]
         df_stocks.append(df_stock)
 
     # combine and return
@@ -98,10 +387,149 @@ class Cache():
       warnings.warn('No relevant stock data found!')
       return None
 
-  def load_statement_data(self, symbols, statement, limit=False, cache=True, load_missing=True, load_data=True):
+  def refresh_stock_data(self, symbols=None, ticker=None, max_age=1):
+    '''Refreshes the cached price history by fetching only the bars newer than the last cached date.
+
+    New bars are merged into the price store (existing dates are replaced by the new values).
+    Symbols that are not in the price store yet are downloaded completely.
+
+    Args:
+      symbols (list): List of symbols to refresh (if None refresh all symbols in the price store)
+      ticker (Ticker): Instance of a ticker to load the data through (if None create AlphaVantage)
+      max_age (int): Number of business days the last cached bar may lie in the past before the symbol is refreshed
+
+    Returns:
+      Dict with the number of added bars per symbol (failed symbols are listed in `Cache.errors`)
+    '''
+    store = self.prices['stock']
+    if symbols is None: symbols = store.symbols()
+    today = pd.Timestamp.now().normalize()
+
+    added = {}
+    self.errors = {}
+    for symbol in symbols:
+      # check the freshness of the data
+      last = store.last_date(symbol)
+      if last is not None and np.busday_count(last.date(), today.date()) <= max_age:
+        added[symbol] = 0
+        continue
+      if self.failures.blocked(symbol, 'stock'):
+        continue
+
+      # fetch the missing bars
+      try:
+        if ticker is None: ticker = AlphaVantageTicker()
+        if last is None:
+          df = ticker.historic(symbol, start=None, resolution='daily')
+        else:
+          df = ticker.historic_tail(symbol, last, resolution='daily')
+        added[symbol] = store.merge(symbol, df)
+      except Exception as e:
+        self.errors[symbol] = e
+        self.failures.record(symbol, 'stock', e, save=False)
+        continue
+    if len(self.errors) > 0:
+      self.failures.save()
+      warnings.warn('Could not refresh {} symbols (see `Cache.errors`)'.format(len(self.errors)))
+
+    return added
+
+  def build_panel(self, symbols=None, value_col='close', stocks=None):
+    '''Materializes a dense price panel (symbols x trading days) of the cached data on disk.
+
+    The panel is stored as memory mappable `.npy` file in the `Panel` folder of the cache (one panel per value column).
+
+    Args:
+      symbols (list): List of symbols to include (if None use all cached stocks)
+      value_col (str): Name of the value column to store in the panel
+      stocks (dict): Stock name dictionary (if None, load with default vals)
+
+    Returns:
+      Memory mapped `PricePanel` (symbols that could not be read are listed in `Cache.errors`)
+    '''
+    if stocks is None: stocks = self.list_data()
+    if symbols is None:
+      symbols = sorted(set(stocks.keys()).union(self.prices['stock'].symbols()))
+
+    # reader for single symbols (skips symbols that can not be read)
+    self.errors = {}
+    def reader(symbol):
+      try:
+        return self._read_stock(symbol, stocks, columns=[value_col]).rename(columns={value_col: 'value'})
+      except Exception as e:
+        self.errors[symbol] = e
+        return None
+
+    panel = PricePanel.build(os.path.join(self.path, 'Panel', value_col), symbols, reader)
+    if len(self.errors) > 0:
+      warnings.warn('Could not read {} symbols (see `Cache.errors`)'.format(len(self.errors)))
+    return panel
+
+  def load_panel(self, value_col='close', mmap=True):
+    '''Loads the price panel for the given value column (see `build_panel`).
+
+    Args:
+      value_col (str): Name of the value column of the panel
+      mmap (bool): Defines if the panel should be memory mapped
+
+    Returns:
+      `PricePanel`
+    '''
+    return PricePanel.load(os.path.join(self.path, 'Panel', value_col), mmap=mmap)
+
+  def statement_store(self, period='quarter'):
+    '''Retrieves the statement store for the given period.
+
+    If a legacy `statements.csv` cache exists and the store is not created yet, the csv is imported once.
+
+    Args:
+      period (str): Period of the statements (options: 'quarter', 'annual')
+
+    Returns:
+      `StatementStore` instance
+    '''
+    store = StatementStore(os.path.join(self.path, 'Statements', period))
+    legacy = os.path.join(self.path, 'statements.csv')
+    if period == 'quarter' and not os.path.exists(store.path) and os.path.exists(legacy):
+      store.convert(legacy)
+    return store
+
+  def statement_index(self, period='quarter', rebuild=False, transform=None, name='asof'):
+    '''Retrieves the persisted as-of index over all statements of the given period (see `StatementIndex`).
+
+    The index is rebuilt if a statement partition was written after the index.
+
+    Args:
+      period (str): Period of the statements (options: 'quarter', 'annual')
+      rebuild (bool): Defines if the index should be rebuilt
+      transform (function): Function that is applied to all statements before indexing (e.g. `normalize_statement_data`)
+      name (str): Name of the index file (use different names for different transforms)
+
+    Returns:
+      `StatementIndex` (or None if no statements are cached)
+    '''
+    store = self.statement_store(period)
+    file = os.path.join(self.path, 'Statements', '{}.{}.parquet'.format(period, name))
+    if not rebuild and os.path.exists(file):
+      updated = max([os.path.getmtime(store.file(symbol)) for symbol in store.symbols()] or [0])
+      if updated <= os.path.getmtime(file):
+        return StatementIndex.load(file)
+
+    df = store.read()
+    if df is None or df.empty:
+      return None
+    if transform is not None:
+      df = transform(df)
+    index = StatementIndex(df)
+    index.save(file)
+    return index
+
+  def load_statement_data(self, symbols, statement, limit=False, cache=True, load_missing=True, load_data=True, workers=None, batch_size=100):
     '''Loads merged statement information for all relevant symbols in the dataset.
 
-    Note: As the cache grows, this might require more memory
+    Statements are stored per symbol, so only the partitions of the requested symbols are read if `limit` is set.
+    Missing statements are loaded in chunks of `batch_size` symbols per `merge_records` call (e.g. one batch request for
+    `IEXStatements`) and stored after each chunk.
 
     Args:
       symbols (list): List of symbols to load
@@ -110,14 +538,18 @@ class Cache():
       cache (bool): If true update the cache with the data that has to be loaded
       load_missing (bool): Defines if data missing from the cache should be loaded through the API
       load_data (bool): Defines if data should be loaded from cache
+      workers (int): Number of concurrent workers (processes for cached data, threads for API calls - if None read the cache
+        serially and use the default of `merge_records`)
+      batch_size (int): Maximal number of symbols per `merge_records` call (limited by the `batch_size` of the statements)
 
     Returns:
       DataFrame containing the relevant statement informations
     '''
     # load the existing statement cache
-    file = os.path.join(self.path, 'statements.csv')
-    if os.path.exists(file) and load_data == True:
-      df_state = pd.read_csv(file).drop('Unnamed: 0', axis=1)
+    store = self.statement_store(getattr(statement, 'period', 'quarter'))
+    self.errors = {}
+    if load_data == True:
+      df_state = store.read(symbols if limit == True else None, workers=workers)
     else:
       df_state = None
 
@@ -125,57 +557,94 @@ class Cache():
     if statement is None and load_missing == True:
       warnings.warn("No statement instance given, no additional data can be loaded! Set `load_missing` to False or pass an instance to silence this warning.")
     if statement is not None and load_missing == True:
-      # find symbols that are not in list
-      if df_state is None:
-        missing = symbols
+      # find symbols that are not in the cache
+      if load_data == True:
+        missing = [symbol for symbol in symbols if not store.contains(symbol)]
       else:
-        missing = np.setdiff1d(symbols, df_state['symbol'].unique())
+        missing = symbols
 
-      # load remaining data
-      df_missing = statement.merge_records(missing)
+      # load remaining data in chunks (and append the new symbols to the cache)
+      batch_size = min(batch_size, getattr(statement, 'batch_size', batch_size))
+      data = []
+      for chunk in utils.parallel.chunks(missing, batch_size):
+        chunk_data, errors = self._fetch_statements(statement, chunk, workers)
+        self.errors.update(errors)
+        chunk_data = [chunk_data[symbol] for symbol in chunk if symbol in chunk_data]
+        if cache == True and len(chunk_data) > 0:
+          store.append(pd.concat(chunk_data, axis=0, sort=True))
+        data += chunk_data
+      if len(self.errors) > 0:
+        warnings.warn('Could not load statements for {} symbols (see `Cache.errors`)'.format(len(self.errors)))
+      df_missing = pd.concat(data, axis=0, sort=True) if len(data) > 0 else pd.DataFrame()
 
       # merge data
       if df_state is None:
         df_state = df_missing
       elif df_missing.empty == False:
-        df_state = pd.concat([df_state, df_missing], axis=0)
-
-      # check for storing
-      if cache == True:
-        df_state.to_csv(file)
+        df_state = pd.concat([df_state, df_missing], axis=0, sort=True)
 
     # filter to only relevant data
-    if limit == True:
+    if limit == True and df_state is not None and df_state.empty == False:
       df_state = df_state[df_state['symbol'].isin(symbols)]
 
     return df_state
 
-  def load_profile_data(self, symbols=None, cache=True, limit=False):
+  def load_profile_data(self, symbols=None, cache=True, limit=False, load_missing=True, batch_size=100):
     '''Loads relevant company profiles.
 
+    Missing profiles are loaded through the batched profile endpoint of FMP (one request per `batch_size` symbols).
+
     Args:
       symbols (list): List of company symbols to load (if None load company profiles from FMP)
       cache (bool): Defines if loaded data should be cached
+      limit (bool): If true limit the output only to the given symbols
+      load_missing (bool): Defines if profiles missing from the cache should be loaded through the API
+      batch_size (int): Maximal number of symbols per request
 
     Returns:
       DataFrame with relevant company profiles
     '''
-    # load the existing statement cache
+    # load the existing profile cache
     file = os.path.join(self.path, 'profiles.csv')
     if os.path.exists(file):
-      df_profiles = pd.read_csv(file).drop('Unnamed: 0', axis=1)
+      df_profiles = pd.read_csv(file)
+      df_profiles = df_profiles.drop([col for col in df_profiles.columns if col.startswith('Unnamed')], axis=1)
     else:
-      df_profiles = None
+      df_profiles = pd.DataFrame(columns=['symbol'])
 
-    # TODO: load missing data
     if symbols is None:
-      symbols = fmp_api.profile.list_symbols()
-
-    # retrieve
-
-    # update the cache
-    if cache == True:
-      df_profiles.to_csv(file)
+      symbols = fmp_api.profile.list_symbols()['symbol'].values
+
+    # retrieve the missing profiles in batches
+    self.errors = {}
+    if load_missing == True:
+      cached = set(df_profiles['symbol'].values)
+      missing = [symbol for symbol in symbols if symbol not in cached and not self.failures.blocked(symbol, 'profile')]
+      if len(missing) > 0:
+        try:
+          df_missing, self.errors = fmp_api.profile.get_profiles(missing, batch_size=batch_size)
+          df_missing = df_missing.reset_index()
+        except Exception as e:
+          self.errors = dict((symbol, e) for symbol in missing)
+          df_missing = pd.DataFrame(columns=['symbol'])
+        if len(self.errors) > 0:
+          warnings.warn('Could not load {} profiles (see `Cache.errors`)'.format(len(self.errors)))
+
+        # record symbols without profile (failed requests are retried earlier than missing profiles)
+        found = set(df_missing['symbol'].values)
+        for symbol in missing:
+          if symbol in self.errors:
+            self.failures.record(symbol, 'profile', self.errors[symbol], kind='transient', save=False)
+          elif symbol not in found:
+            self.failures.record(symbol, 'profile', None, save=False)
+        if len(found) < len(missing):
+          self.failures.save()
+
+        # update the cache
+        if df_missing.empty == False:
+          df_profiles = pd.concat([df_profiles, df_missing], axis=0, sort=False).reset_index(drop=True)
+          if cache == True:
+            utils.atomic_write(file, lambda tmp: df_profiles.to_csv(tmp, index=False))
 
     # filter to only relevant data
     if limit == True:
@@ -0,0 +1,191 @@
+'''Ticker that combines multiple providers and hedges slow requests.
+
+Requests go to the primary provider first. If it has not answered after its hedge delay (the observed p95 latency), the
+request is also sent to the next provider and the first valid answer is returned. Failed requests fail over directly.
+'''
+
+import math
+import time
+import bisect
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from .Ticker import Ticker
+
+# upper bounds (in seconds) of the latency histogram buckets (last bucket is unbounded)
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+class ProviderStats():
+  '''Latency and error statistics of a single provider.
+
+  Args:
+    window (int): Number of recent latencies used to compute quantiles
+  '''
+  def __init__(self, window=200):
+    self._lock = threading.Lock()
+    self.latencies = deque(maxlen=window)
+    self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    self.errors = {}
+    self.calls = 0
+    self.wins = 0
+    self.hedges = 0
+
+  def record(self, latency, error=None):
+    '''Records a finished request (errors are counted by their exception type).'''
+    with self._lock:
+      self.calls += 1
+      if error is not None:
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+        return
+      self.latencies.append(latency)
+      self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+  def quantile(self, q):
+    '''Computes the quantile of the recent latencies (None if there are no samples).'''
+    with self._lock:
+      values = sorted(self.latencies)
+    if len(values) == 0:
+      return None
+    return values[min(len(values) - 1, int(math.ceil(q * len(values))) - 1)]
+
+
+class CompositeTicker(Ticker):
+  '''Ticker that sends requests to multiple providers and returns the first valid answer.
+
+  Example:
+    ```
+    ticker = CompositeTicker({'alphavantage': AlphaVantageTicker(), 'fmp': FMPTicker()})
+    price = ticker.price('MSFT')
+    print(ticker.stats())
+    ```
+
+  Args:
+    tickers (dict): Dictionary of provider name to `Ticker` in order of preference (a list uses the class names,
+      suffixed by their position for multiple tickers of the same class)
+    hedge (bool): Defines if slow requests are sent to the next provider (otherwise only fail over on errors)
+    quantile (float): Quantile of the observed latencies that is used as hedge delay
+    min_delay (float): Minimal hedge delay in seconds
+    max_delay (float): Maximal hedge delay in seconds
+    default_delay (float): Hedge delay in seconds until `min_samples` latencies are observed
+    min_samples (int): Number of latencies required to derive the hedge delay
+    window (int): Number of recent latencies per provider used to compute the quantiles
+    workers (int): Maximal number of concurrent requests
+  '''
+  def __init__(self, tickers, hedge=True, quantile=0.95, min_delay=0.05, max_delay=10, default_delay=1,
+               min_samples=10, window=200, workers=8):
+    if not isinstance(tickers, dict):
+      tickers = _name_tickers(tickers)
+    if len(tickers) == 0:
+      raise ValueError("CompositeTicker requires at least one ticker")
+    self.tickers = tickers
+    self.hedge = hedge
+    self.quantile = quantile
+    self.min_delay = min_delay
+    self.max_delay = max_delay
+    self.default_delay = default_delay
+    self.min_samples = min_samples
+    self.providers = dict((name, ProviderStats(window)) for name in tickers)
+    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='CompositeTicker')
+
+  def hedge_delay(self, name):
+    '''Computes the time in seconds to wait for the provider before the next provider is requested.'''
+    stats = self.providers[name]
+    if len(stats.latencies) < self.min_samples:
+      return self.default_delay
+    return min(self.max_delay, max(self.min_delay, stats.quantile(self.quantile)))
+
+  def _call(self, name, method, args, kwargs, valid):
+    '''Calls the method of the provider and records the latency (invalid answers count as errors).'''
+    start = time.monotonic()
+    try:
+      result = getattr(self.tickers[name], method)(*args, **kwargs)
+      if not valid(result):
+        raise ValueError("Invalid answer from {} for {}".format(name, method))
+    except Exception as e:
+      self.providers[name].record(time.monotonic() - start, e)
+      raise
+    self.providers[name].record(time.monotonic() - start)
+    return result
+
+  def _race(self, method, args, kwargs, valid):
+    '''Requests the providers in order (hedged by their delay) and returns the first valid answer.'''
+    names = list(self.tickers.keys())
+    pending = {}
+    errors = {}
+    hedged = False
+    while len(names) > 0 or len(pending) > 0:
+      # send the request to the next provider (after a timeout of the pending requests or on errors)
+      if len(names) > 0:
+        name = names.pop(0)
+        if hedged:
+          self.providers[name].hedges += 1
+        pending[self._pool.submit(self._call, name, method, args, kwargs, valid)] = name
+      timeout = self.hedge_delay(name) if self.hedge and len(names) > 0 else None
+
+      # wait for the first answer (or the hedge delay)
+      done, _ = wait(list(pending.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+      hedged = len(done) == 0
+      for future in done:
+        name = pending.pop(future)
+        if future.exception() is None:
+          self.providers[name].wins += 1
+          # note: slower requests keep running in the background and are recorded in the stats
+          return future.result()
+        errors[name] = future.exception()
+
+    raise ValueError("All providers failed for {} ({})".format(method,
+      ', '.join('{}: {}'.format(name, e) for name, e in errors.items())))
+
+  def price(self, symbol):
+    '''Retrieves the current price of the given stock from the fastest valid provider (see `Ticker.price`).'''
+    return self._race('price', (symbol,), {}, _valid_price)
+
+  def historic(self, symbol, start, end=None, resolution='daily'):
+    '''Retrieves the historic prices from the fastest valid provider (see `Ticker.historic`).'''
+    return self._race('historic', (symbol, start), {'end': end, 'resolution': resolution}, _valid_frame)
+
+  def historic_tail(self, symbol, since, resolution='daily'):
+    '''Retrieves the latest bars from the fastest valid provider (see `Ticker.historic_tail`).'''
+    return self._race('historic_tail', (symbol, since), {'resolution': resolution}, _valid_frame)
+
+  def stats(self):
+    '''Summarizes the statistics of all providers.
+
+    Returns:
+      DataFrame with one row per provider (latency quantiles in seconds)
+    '''
+    rows = []
+    for name, stats in self.providers.items():
+      rows.append({'provider': name, 'calls': stats.calls, 'errors': sum(stats.errors.values()),
+        'wins': stats.wins, 'hedges': stats.hedges, 'p50': stats.quantile(0.5), 'p95': stats.quantile(0.95),
+        'p99': stats.quantile(0.99), 'hedge_delay': self.hedge_delay(name)})
+    return pd.DataFrame(rows).set_index('provider')
+
+  def histogram(self, name):
+    '''Retrieves the latency histogram of the provider.
+
+    Returns:
+      `pd.Series` of the request counts indexed by the upper bound of the buckets in seconds
+    '''
+    return pd.Series(self.providers[name].histogram, index=LATENCY_BUCKETS + [math.inf], name=name)
+
+  def close(self):
+    '''Waits for pending requests and shuts down the worker threads.'''
+    self._pool.shutdown(wait=True)
+
+
+def _name_tickers(tickers):
+  '''Names the list of tickers by their class (duplicate classes are suffixed by the position, e.g. `FMPTicker_1`).'''
+  tickers = list(tickers)
+  classes = [type(ticker).__name__ for ticker in tickers]
+  names = [cls if classes.count(cls) == 1 else '{}_{}'.format(cls, i) for i, cls in enumerate(classes)]
+  return dict(zip(names, tickers))
+
+def _valid_price(price):
+  return price is not None and price.get('close') is not None and not pd.isnull(price['close'])
+
+def _valid_frame(df):
+  return df is not None and not df.empty
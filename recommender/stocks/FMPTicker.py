@@ -0,0 +1,121 @@
+'''
+Ticker for the FinancialModelingPrep API.
+
+Used mostly for bulk downloads of daily history (see `fmp_api.prices`).
+'''
+
+import pandas as pd
+from .Ticker import Ticker, TickerResolution, TickerGranularity, to_panel
+from recommender.contrib import fmp_api
+from recommender import utils
+
+# timezone of the exchanges covered by the api
+EXCHANGE_TZ = 'America/New_York'
+
+
+class FMPTicker(Ticker):
+  '''Ticker implementation for the FinancialModelingPrep API.
+
+  Note that only daily resolution is supported.
+
+  Example:
+    ```
+    ticker = FMPTicker()
+    data = ticker.historic('MSFT', start=None)
+    ```
+  '''
+
+  def price(self, symbol):
+    '''Retrieves the current price of the given stock.
+
+    Args:
+      symbol: `str` of the symbol name
+
+    Returns:
+      `dict` that contains open, close, volume, high, low, timestamp
+    '''
+    prices, errors = self.prices([symbol])
+    if symbol in errors:
+      raise errors[symbol]
+    return prices[symbol]
+
+  def prices(self, symbols):
+    '''Retrieves the current prices of many stocks through batched quote requests.
+
+    Args:
+      symbols: `list` of symbol names
+
+    Returns:
+      prices: `dict` of symbol to the output of `price`
+      errors: `dict` of symbol to the raised exception
+    '''
+    df = fmp_api.profile.get_quotes(symbols)
+    prices, errors = {}, {}
+    for symbol in symbols:
+      if df.empty or symbol not in df.index:
+        errors[symbol] = ValueError("The given stock symbol ({}) was not found in FMP".format(symbol))
+        continue
+      quote = df.loc[symbol]
+      prices[symbol] = {
+        'timestamp': pd.Timestamp(int(quote['timestamp']), unit='s', tz='UTC').to_pydatetime(),
+        'open': quote['open'], 'close': quote['price'],
+        'high': quote['dayHigh'], 'low': quote['dayLow'],
+        'volume': quote['volume']}
+    return prices, errors
+
+  def _format(self, df, resolution):
+    '''Converts the prices of `fmp_api.prices` into the ticker format.'''
+    if resolution.adjusted and 'adjclose' in df.columns:
+      df = df.assign(close=df['adjclose'])
+    df = df.drop(['adjclose'], axis=1, errors='ignore').set_index('date')
+    df.index = df.index.tz_localize(EXCHANGE_TZ)
+    return df
+
+  def historic(self, symbol, start, end=None, resolution='daily'):
+    '''Retrieves the historic prices from the FMP API.
+
+    Args:
+      symbol: `str` of the symbol name
+      start: `datetime` or `long` of the starting point (`None` = from earliest)
+      end: `datetime` or `long` of the ending point (`None` = up to current)
+      resolution: `TickerResolution` or `str` on the resolution of the data. (only `daily` and `daily_adjusted`)
+
+    Returns:
+      `pd.dataframe` with a `pd.DatetimeIndex` and columns `open`, `close`, `low`, `high`, `volume`.
+    '''
+    # safty: covnert input data
+    start = utils.safe_datetime(start)
+    end = utils.safe_datetime(end)
+
+    # handle resolution
+    if isinstance(resolution, str):
+      resolution = TickerResolution.from_string(resolution)
+    if resolution.granularity != TickerGranularity.DAILY:
+      raise ValueError("FMPTicker only supports daily resolution")
+
+    df = fmp_api.prices.historical(symbol, start, end)
+    return self._format(df, resolution)
+
+  def historic_many(self, symbols, start, end=None, resolution='daily', workers=None):
+    '''Retrieves the historic prices of many stocks through batched requests (see `Ticker.historic_many`).
+
+    Args:
+      workers: `int` unused (batches are requested serially to respect the rate limits)
+    '''
+    # safty: covnert input data
+    start = utils.safe_datetime(start)
+    end = utils.safe_datetime(end)
+    if isinstance(resolution, str):
+      resolution = TickerResolution.from_string(resolution)
+    if resolution.granularity != TickerGranularity.DAILY:
+      raise ValueError("FMPTicker only supports daily resolution")
+
+    symbols = list(dict.fromkeys(symbols))
+    data = fmp_api.prices.historical_batch(symbols, start, end)
+    frames, errors = {}, {}
+    for symbol in symbols:
+      if symbol not in data:
+        errors[symbol] = ValueError("The given stock symbol ({}) was not found in FMP".format(symbol))
+        continue
+      frames[symbol] = self._format(data[symbol], resolution)
+    return to_panel(frames), errors
@@ -1,12 +1,203 @@
 '''Uses the Iex Cloud Service to implement the Statements interface.'''
 
 
+import functools
+import warnings
 import pandas as pd
-import numpy as np
-import iexfinance as iex
 from .Statements import Statements
+from .StatementSchema import register_schema, get_schema
+# note: import to register the fmp schemas (used for the common columns)
+from .FMPStatements import FMPStatements
+from recommender import utils
+
+# base url of the api (can be replaced by a local mock server)
+BASE_URL = 'https://cloud.iexapis.com/stable'
+# maximal number of symbols per batch request
+MAX_BATCH = 100
+# statement types of the batch endpoint as (type name, key of the records)
+TYPES = {
+  'balance_sheet': ('balance-sheet', 'balancesheet'),
+  'income': ('income', 'income'),
+  'cash_flow': ('cash-flow', 'cashflow')
+}
+
+# schemas of the statements in the common format (same columns as `FMPStatements`)
+register_schema('iex', 'balance_sheet', {
+  'currentCash': 'cash',
+  'shortTermInvestments': 'marketable_securities',
+  'currentLongTermDebt': 'debt_shortterm',
+  'longTermDebt': 'debt_longterm',
+  'totalAssets': 'assets_total',
+  'currentAssets': 'assets_total_current',
+  'totalLiabilities': 'liability_total',
+  'longTermInvestments': 'investments',
+  'inventory': 'inventory',
+  'shareholderEquity': 'shareholder_equity'
+}, columns=get_schema('fmp', 'balance_sheet').columns, date_col='fiscalDate')
+register_schema('iex', 'income', {
+  'ebit': 'ebit',
+  'costOfRevenue': 'revenue_costs',
+  'grossProfit': 'gross_profit',
+  'researchAndDevelopment': 'expenses_research',
+  'operatingExpense': 'expenses_operating',
+  'netIncome': 'income_net',
+  'operatingIncome': 'income_operating',
+  'totalRevenue': 'revenue'
+}, columns=get_schema('fmp', 'income').columns, date_col='fiscalDate')
+register_schema('iex', 'cash_flow', {
+  'capitalExpenditures': 'capital_expenditure',
+  'totalInvestingCashFlows': 'cashflow_invest',
+  'cashFlowFinancing': 'cashflow_finance',
+  'cashFlow': 'cashflow_operate',
+  'dividendsPaid': 'dividends'
+}, columns=get_schema('fmp', 'cash_flow').columns, date_col='fiscalDate')
+# note: IEX Cloud provides no growth statements (the columns are `NaN` for the dates of the other statements)
+register_schema('iex', 'growth', {}, columns=get_schema('fmp', 'growth', 'annual').columns, date_col='fiscalDate')
 
 
 class IEXStatements(Statements):
-  '''Retrieves statements of a company through the IEX Cloud API.'''
-  pass
+  '''Retrieves statements of a company through the IEX Cloud API.
+
+  Statements of many symbols are loaded through the batch endpoint (up to 100 symbols and all statement types per request).
+  Note that IEX Cloud provides no growth statements, so the growth columns are `NaN`.
+
+  Example:
+    ```
+    statements = IEXStatements(base_url='http://localhost:8000/stable')   # e.g. local mock server
+    df = statements.merge_records(['AAPL', 'MSFT'])
+    ```
+
+  Args:
+    token (str): API token for IEX Cloud (if None try to load it through `utils.read_keys`)
+    granularity (str): Default granularity that is used for statements (options: 'annual', 'quarter')
+    last (int): Number of statements to retrieve per symbol (IEX allows up to 12 quarters or 4 years)
+    base_url (str): Base url of the api
+    batch_size (int): Maximal number of symbols per request
+    session (requests.Session): Session to use for the requests (if None create a new retrying session)
+  '''
+  def __init__(self, token=None, granularity='quarter', last=12, base_url=BASE_URL, batch_size=MAX_BATCH, session=None):
+    if token is None:
+      token = utils.read_keys()['iexcloud']
+    self.__token = token
+    self.period = granularity
+    self.last = last
+    self.base_url = base_url.rstrip('/')
+    self.batch_size = min(batch_size, MAX_BATCH)
+    self.session = session if session is not None else utils.http.create_session()
+
+  def fetch(self, symbols, statements=None, period=None):
+    '''Retrieves the raw statements of the given symbols with a single batch request.
+
+    Args:
+      symbols (list): List of symbols (at most `batch_size`)
+      statements (list): List of statement types (options: 'balance_sheet', 'income', 'cash_flow' - if None use all)
+      period (str): Interval for the statements (if None use the default granularity)
+
+    Returns:
+      Dictionary of symbol to dictionary of statement type to DataFrame of the raw records
+    '''
+    if len(symbols) > self.batch_size:
+      raise ValueError("Batch requests allow at most {} symbols (given {})".format(self.batch_size, len(symbols)))
+    statements = list(TYPES.keys()) if statements is None else statements
+    params = {
+      'symbols': ','.join(symbols),
+      'types': ','.join(TYPES[kind][0] for kind in statements),
+      'period': self.period if period is None else period,
+      'last': self.last,
+      'token': self.__token
+    }
+    utils.ratelimit.acquire('iex')
+    res = self.session.get('{}/stock/market/batch'.format(self.base_url), params=params, timeout=utils.http.DEFAULT_TIMEOUT)
+    res.raise_for_status()
+    data = res.json()
+
+    # convert the records (note: the api returns upper case symbols)
+    result = {}
+    for symbol in symbols:
+      entry = data.get(symbol.upper(), data.get(symbol)) or {}
+      result[symbol] = {}
+      for kind in statements:
+        name, key = TYPES[kind]
+        records = (entry.get(name) or {}).get(key) or []
+        result[symbol][kind] = pd.DataFrame(records)
+    return result
+
+  def _statement(self, kind, symbol, before, after, period):
+    '''Loads a single statement type of the given symbol and converts it into the common format.'''
+    period = self.period if period is None else period
+    df = self.fetch([symbol], [kind], period)[symbol][kind]
+    if df.empty:
+      raise ValueError("No {} statements found for {}".format(kind, symbol))
+    return get_schema('iex', kind, period).transform(df, before, after)
+
+  def balance_sheet(self, symbol, before=None, after=None, period=None):
+    return self._statement('balance_sheet', symbol, before, after, period)
+
+  def cash_flow(self, symbol, before=None, after=None, period=None):
+    return self._statement('cash_flow', symbol, before, after, period)
+
+  def income(self, symbol, before=None, after=None, period=None):
+    return self._statement('income', symbol, before, after, period)
+
+  def growth(self, symbol, before=None, after=None, period=None):
+    '''Retrieves the growth columns for the dates of the income statements (all `NaN` as IEX Cloud provides no growth).'''
+    period = self.period if period is None else period
+    df = self.fetch([symbol], ['income'], period)[symbol]['income']
+    if df.empty:
+      raise ValueError("No growth statements found for {}".format(symbol))
+    return get_schema('iex', 'growth', period).transform(df, before, after)
+
+  def merge_records(self, stocks, before=None, after=None, annual_growth=True, workers=None):
+    '''Merges different statements into one dataframe.
+
+    All statement types of up to `batch_size` symbols are loaded with a single request. Symbols without statements are
+    listed in `Statements.errors`.
+
+    Args:
+      stocks (list): List of stock symbols to load
+      before (date): Date before which the statements should be issued
+      after (date): Date after which the statements should be issued
+      annual_growth (bool): Unused (IEX Cloud provides no growth statements)
+      workers (int): Maximal number of concurrent batch requests (if None load serially)
+
+    Returns:
+      Merged DataFrame of all records
+    '''
+    symbols = list(dict.fromkeys(stocks))
+    batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+    results, fails = utils.parallel.map_parallel(self.fetch, batches, workers, mode='thread')
+
+    # convert the statements per symbol
+    self.errors = {}
+    dfs = []
+    for i, batch in enumerate(batches):
+      for stock in batch:
+        if i in fails:
+          self.errors[stock] = dict((kind, fails[i]) for kind in TYPES)
+          continue
+        df_state = []
+        for kind, df in results[i][stock].items():
+          if df.empty:
+            self.errors.setdefault(stock, {})[kind] = ValueError("No {} statements found for {}".format(kind, stock))
+            continue
+          df_state.append(get_schema('iex', kind, self.period).transform(df, before, after))
+
+        # check if valid
+        if len(df_state) == 0: continue
+
+        # merge data
+        df = functools.reduce(lambda acc, val: acc.join(val), df_state).reset_index()
+        df['symbol'] = stock
+        dfs.append(df)
+
+    # combine all
+    if len(dfs) == 0:
+      warnings.warn("No statements found for given symbols")
+      return pd.DataFrame()
+    df = pd.concat(dfs, axis=0, sort=True)
+    # add missing columns (e.g. growth) as `NaN` to keep the same columns as the other providers
+    columns = [col for kind in self.STATEMENT_TYPES for col in get_schema('iex', kind, 'annual').columns]
+    df = df.reindex(columns=sorted(set(df.columns).union(columns)))
+
+    self._update_cube(df)
+    return df
@@ -0,0 +1,197 @@
+'''Persistent manifest of the cached price files.
+
+The manifest keeps one entry per symbol (path, row count, first and last date, file size and checksum).
+It is stored as append-only json lines file, so single updates only append one line, and is compacted on load.
+'''
+
+import os
+import json
+import hashlib
+import pandas as pd
+from recommender import utils
+
+
+def file_checksum(file):
+  '''Calculates the md5 checksum of the given file.'''
+  md5 = hashlib.md5()
+  with open(file, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      md5.update(chunk)
+  return md5.hexdigest()
+
+def _naive(dt):
+  '''Converts the given date into a timezone-naive `pd.Timestamp`.'''
+  ts = pd.Timestamp(dt)
+  return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+def _timestamp(dt):
+  '''Converts the given date into an iso string (or None).'''
+  if dt is None or pd.isnull(dt):
+    return None
+  return _naive(dt).isoformat()
+
+
+class Manifest():
+  '''Index of cached files that answers existence and date-coverage queries without touching the files.
+
+  Example:
+    ```
+    manifest = Manifest('../data/Prices/Stocks/manifest.jsonl')
+    symbols = manifest.filter(['aapl', 'msft'], start='2010-01-01', end='2015-01-01')
+    ```
+
+  Args:
+    file (str): Path of the manifest file
+  '''
+  def __init__(self, file):
+    self.file = file
+    self._lock = '{}.lock'.format(file)
+    self._lines = 0
+    self._removed = set()
+    self.entries = self._read()
+    # compact the file if it contains many outdated lines
+    if self._lines > 2 * len(self.entries) + 100:
+      self.compact()
+
+  def _read(self):
+    '''Reads the manifest from disk (later lines overwrite earlier ones).'''
+    entries = {}
+    if not os.path.exists(self.file):
+      return entries
+    lines = 0
+    with open(self.file, 'r') as f:
+      for line in f:
+        if len(line.strip()) == 0: continue
+        entry = json.loads(line)
+        symbol = entry.pop('symbol')
+        if entry.get('removed', False):
+          entries.pop(symbol, None)
+        else:
+          entries[symbol] = entry
+        lines += 1
+    self._lines = lines
+    return entries
+
+  def _append(self, lines):
+    '''Appends the given entries to the manifest file.'''
+    os.makedirs(os.path.dirname(os.path.abspath(self.file)), exist_ok=True)
+    with utils.FileLock(self._lock):
+      with open(self.file, 'a') as f:
+        for line in lines:
+          f.write(json.dumps(line) + '\n')
+
+  def __contains__(self, symbol):
+    return symbol.lower() in self.entries
+
+  def __len__(self):
+    return len(self.entries)
+
+  def exists(self):
+    '''Checks if the manifest file exists on disk.'''
+    return os.path.exists(self.file)
+
+  def symbols(self):
+    '''Lists all symbols in the manifest.'''
+    return list(self.entries.keys())
+
+  def get(self, symbol):
+    '''Retrieves the entry of the given symbol (or None).'''
+    return self.entries.get(symbol.lower())
+
+  def paths(self):
+    '''Retrieves a dictionary of symbols to file paths.'''
+    return dict((symbol, entry['path']) for symbol, entry in self.entries.items())
+
+  def update(self, symbol, path, rows=None, first=None, last=None, save=True):
+    '''Updates the entry of the given symbol.
+
+    Args:
+      symbol (str): Name of the symbol
+      path (str): Path of the file that holds the data
+      rows (int): Number of rows in the file
+      first (datetime): Date of the first row
+      last (datetime): Date of the last row
+      save (bool): Defines if the entry should be appended to the manifest file directly (otherwise call `save`)
+
+    Returns:
+      The created entry
+    '''
+    entry = {
+      'path': path, 'rows': None if rows is None else int(rows),
+      'first': _timestamp(first), 'last': _timestamp(last),
+      'size': os.path.getsize(path), 'checksum': file_checksum(path)
+    }
+    self.entries[symbol.lower()] = entry
+    self._removed.discard(symbol.lower())
+    if save: self.save([symbol])
+    return entry
+
+  def remove(self, symbol, save=True):
+    '''Removes the entry of the given symbol.'''
+    self.entries.pop(symbol.lower(), None)
+    self._removed.add(symbol.lower())
+    if save: self._append([{'symbol': symbol.lower(), 'removed': True}])
+
+  def save(self, symbols=None):
+    '''Persists the entries of the given symbols (if None rewrite the complete manifest).'''
+    if symbols is None:
+      self.compact()
+      return
+    self._append([dict(self.entries[symbol.lower()], symbol=symbol.lower()) for symbol in symbols if symbol in self])
+
+  def compact(self):
+    '''Rewrites the manifest file with one line per symbol (merged with entries written by other processes).'''
+    def write(tmp):
+      with open(tmp, 'w') as f:
+        for symbol, entry in self.entries.items():
+          f.write(json.dumps(dict(entry, symbol=symbol)) + '\n')
+    with utils.FileLock(self._lock):
+      entries = self._read()
+      entries.update(self.entries)
+      for symbol in self._removed:
+        entries.pop(symbol, None)
+      self.entries = entries
+      utils.atomic_write(self.file, write)
+    self._lines = len(self.entries)
+
+  def first_date(self, symbol):
+    '''Retrieves the date of the first row of the given symbol (or None).'''
+    entry = self.get(symbol)
+    return None if entry is None or entry['first'] is None else pd.Timestamp(entry['first'])
+
+  def last_date(self, symbol):
+    '''Retrieves the date of the last row of the given symbol (or None).'''
+    entry = self.get(symbol)
+    return None if entry is None or entry['last'] is None else pd.Timestamp(entry['last'])
+
+  def covers(self, symbol, start=None, end=None, tolerance=4):
+    '''Checks if the cached history of the given symbol covers the requested window.
+
+    Args:
+      symbol (str): Name of the symbol
+      start (datetime): First date of the window (if None only check existence)
+      end (datetime): Last date of the window (if None only check existence)
+      tolerance (int): Number of days the history might start after `start` or end before `end` (e.g. weekends and holidays)
+
+    Returns:
+      `True` if the window is covered
+    '''
+    entry = self.get(symbol)
+    if entry is None:
+      return False
+    tol = pd.Timedelta(days=tolerance)
+    if start is not None and (entry['first'] is None or pd.Timestamp(entry['first']) > _naive(start) + tol):
+      return False
+    if end is not None and (entry['last'] is None or pd.Timestamp(entry['last']) < _naive(end) - tol):
+      return False
+    return True
+
+  def filter(self, symbols, start=None, end=None, tolerance=4):
+    '''Filters the given symbols to the ones that cover the requested window (see `covers`).'''
+    return [symbol for symbol in symbols if self.covers(symbol, start, end, tolerance)]
+
+  def to_frame(self):
+    '''Converts the manifest into a DataFrame with one row per symbol.'''
+    df = pd.DataFrame.from_dict(self.entries, orient='index')
+    df.index.name = 'symbol'
+    return df
@@ -0,0 +1,171 @@
+'''Negative-result cache that remembers symbols which failed to load from the provider APIs.
+
+Failures are classified into `not_found` (e.g. delisted or unknown symbols) and `transient` (e.g. network errors or throttling).
+Each class has its own time-to-live, after which the symbol is requested from the API again.
+'''
+
+import os
+import json
+import requests
+import pandas as pd
+from datetime import datetime, timedelta
+from recommender import utils
+
+# default time-to-live for each class of errors
+DEFAULT_TTLS = {
+  'not_found': timedelta(days=7),
+  'transient': timedelta(hours=1)
+}
+# message patterns that identify throttling by the APIs
+_TRANSIENT_PATTERNS = ['call frequency', 'rate limit', 'too many requests', 'timeout', 'timed out', 'temporarily']
+# message patterns of missing responses in the replay mode of the api cache (see `fmp_api.cache`)
+_REPLAY_PATTERNS = ['no cached response']
+
+
+def _iso(dt):
+  '''Converts the datetime into a sortable iso string.'''
+  return dt.isoformat(timespec='seconds')
+
+def classify_error(error):
+  '''Classifies the given exception into `not_found` or `transient`.
+
+  Args:
+    error (Exception): Exception raised while loading (if None the result was empty)
+
+  Returns:
+    Name of the error class
+  '''
+  if error is None:
+    return 'not_found'
+  # note: check the specific errors first (invalid json bodies and cache misses are value and key errors)
+  if isinstance(error, (json.JSONDecodeError, utils.ratelimit.RateLimitExceeded)):
+    return 'transient'
+  if isinstance(error, requests.HTTPError) and error.response is not None:
+    status = error.response.status_code
+    if status == 429 or status >= 500:
+      return 'transient'
+    if status == 404:
+      return 'not_found'
+  msg = str(error).lower()
+  if any(pattern in msg for pattern in _TRANSIENT_PATTERNS + _REPLAY_PATTERNS):
+    return 'transient'
+  if isinstance(error, (ValueError, KeyError)):
+    return 'not_found'
+  return 'transient'
+
+
+class NegativeCache():
+  '''Stores failed symbol requests on disk to avoid repeated API calls.
+
+  Example:
+    ```
+    failures = NegativeCache('../data/failures.json')
+    if not failures.blocked('XXXX', 'stock'):
+      # load the data
+    ```
+
+  Args:
+    file (str): Path of the json file to store the failures in
+    ttls (dict): Dictionary of error class to `timedelta` (overwrites the `DEFAULT_TTLS`)
+  '''
+  def __init__(self, file, ttls=None):
+    self.file = file
+    self._lock = '{}.lock'.format(file)
+    self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+    self.entries = self._read()
+
+  def _read(self):
+    '''Reads the failures from disk.'''
+    if not os.path.exists(self.file):
+      return {}
+    with open(self.file, 'r') as f:
+      return json.load(f)
+
+  def _write(self, tmp):
+    '''Writes the failures into the given file.'''
+    with open(tmp, 'w') as f:
+      json.dump(self.entries, f)
+
+  def _key(self, symbol, scope):
+    return '{}:{}'.format(scope, symbol.upper())
+
+  def save(self):
+    '''Persists the failures (merged with the failures recorded by other processes).'''
+    with utils.FileLock(self._lock):
+      entries = self._read()
+      entries.update(self.entries)
+      self.entries = entries
+      utils.atomic_write(self.file, self._write)
+
+  def record(self, symbol, scope, error=None, kind=None, save=True):
+    '''Records a failed request.
+
+    Args:
+      symbol (str): Name of the symbol
+      scope (str): Type of data that failed to load (e.g. 'stock', 'statement')
+      error (Exception): The raised exception (if None the result was empty)
+      kind (str): Class of the error (if None use `classify_error`)
+      save (bool): Defines if the failure should be persisted directly (otherwise call `save`)
+    '''
+    kind = classify_error(error) if kind is None else kind
+    if kind not in self.ttls:
+      raise ValueError("Unkown error class ({})".format(kind))
+    now = datetime.now()
+    self.entries[self._key(symbol, scope)] = {
+      'symbol': symbol, 'scope': scope, 'kind': kind,
+      'error': 'empty result' if error is None else '{}: {}'.format(type(error).__name__, error),
+      'time': _iso(now), 'expires': _iso(now + self.ttls[kind])
+    }
+    if save: self.save()
+
+  def get(self, symbol, scope):
+    '''Retrieves the active failure entry of the given symbol (or None if there is none or it is expired).'''
+    entry = self.entries.get(self._key(symbol, scope))
+    if entry is None or entry['expires'] < _iso(datetime.now()):
+      return None
+    return entry
+
+  def blocked(self, symbol, scope):
+    '''Checks if requests for the given symbol should be skipped.'''
+    return self.get(symbol, scope) is not None
+
+  def list(self, scope=None, kind=None, expired=True):
+    '''Lists the recorded failures.
+
+    Args:
+      scope (str): Only list failures of the given scope (if None list all)
+      kind (str): Only list failures of the given error class (if None list all)
+      expired (bool): Defines if expired failures should be included
+
+    Returns:
+      DataFrame with one row per failure
+    '''
+    now = _iso(datetime.now())
+    rows = [entry for entry in self.entries.values()
+      if (scope is None or entry['scope'] == scope) and (kind is None or entry['kind'] == kind) and (expired or entry['expires'] >= now)]
+    return pd.DataFrame(rows, columns=['symbol', 'scope', 'kind', 'error', 'time', 'expires'])
+
+  def purge(self, symbols=None, scope=None, kind=None, expired_only=False):
+    '''Removes recorded failures.
+
+    Args:
+      symbols (list): Only remove failures of the given symbols (if None remove all)
+      scope (str): Only remove failures of the given scope (if None remove all)
+      kind (str): Only remove failures of the given error class (if None remove all)
+      expired_only (bool): Defines if only expired failures should be removed
+
+    Returns:
+      Number of removed failures
+    '''
+    symbols = None if symbols is None else set(symbol.upper() for symbol in symbols)
+    now = _iso(datetime.now())
+    with utils.FileLock(self._lock):
+      self.entries = dict(self._read(), **self.entries)
+      keys = [key for key, entry in self.entries.items()
+        if (symbols is None or entry['symbol'].upper() in symbols) and (scope is None or entry['scope'] == scope)
+        and (kind is None or entry['kind'] == kind) and (not expired_only or entry['expires'] < now)]
+      for key in keys:
+        del self.entries[key]
+      utils.atomic_write(self.file, self._write)
+
+    return len(keys)
@@ -0,0 +1,140 @@
+'''Dense price panel that aligns the prices of many symbols on a shared trading-day axis.
+
+The panel is a `float32` matrix of shape (symbols, days), where days without data for a symbol are `NaN`.
+It can be stored as `.npy` file and memory mapped, so windows can be taken from it without loading the full universe.
+'''
+
+import os
+import numpy as np
+import pandas as pd
+
+
+class PricePanel():
+  '''Price panel of the shape symbols x trading days.
+
+  Example:
+    ```
+    panel = PricePanel.load('../data/Panel/close')
+    row = panel.row('aapl')
+    ```
+
+  Args:
+    values (np.ndarray): `float32` array of shape (symbols, days) (might be a `np.memmap`)
+    symbols (list): List of symbol names (one per row)
+    dates (list): List of trading days (one per column, sorted ascending)
+  '''
+  def __init__(self, values, symbols, dates):
+    self.values = values
+    self.symbols = list(symbols)
+    self.dates = pd.DatetimeIndex(dates)
+    self._index = dict((symbol.lower(), i) for i, symbol in enumerate(self.symbols))
+
+  def __len__(self):
+    return len(self.symbols)
+
+  def __contains__(self, symbol):
+    return symbol.lower() in self._index
+
+  def index(self, symbol):
+    '''Retrieves the row number of the given symbol.'''
+    return self._index[symbol.lower()]
+
+  def row(self, symbol):
+    '''Retrieves the prices of the given symbol as view on the panel (no copy).'''
+    return self.values[self.index(symbol)]
+
+  def valid_range(self, i):
+    '''Retrieves the first and last column of row `i` that contain data (or `None` if the row is empty).'''
+    valid = np.flatnonzero(~np.isnan(self.values[i]))
+    if len(valid) == 0:
+      return None
+    return valid[0], valid[-1]
+
+  def chunks(self, chunk_size):
+    '''Splits the panel into sub-panels of at most `chunk_size` symbols (the values are views on this panel).
+
+    Args:
+      chunk_size (int): Maximal number of symbols per sub-panel
+
+    Returns:
+      Generator of `PricePanel` objects
+    '''
+    for i in range(0, len(self.symbols), chunk_size):
+      yield PricePanel(self.values[i:i + chunk_size], self.symbols[i:i + chunk_size], self.dates)
+
+  def to_frame(self):
+    '''Converts the panel into a DataFrame with dates as index and symbols as columns.'''
+    return pd.DataFrame(self.values.T, index=self.dates, columns=self.symbols)
+
+  @classmethod
+  def from_frame(cls, df, value_col='close'):
+    '''Creates an in-memory panel from a long-format stock DataFrame in a single pass.
+
+    Args:
+      df (DataFrame): DataFrame of stock prices with the columns `[symbol, date, value_col]`
+      value_col (str): Name of the column that holds the values
+
+    Returns:
+      `PricePanel` with all symbols from the DataFrame
+    '''
+    symbols, sym_codes = np.unique(df['symbol'].values, return_inverse=True)
+    dates, date_codes = np.unique(pd.to_datetime(df['date']).values, return_inverse=True)
+
+    # scatter the values into the panel (later rows overwrite duplicates)
+    values = np.full((len(symbols), len(dates)), np.nan, dtype='float32')
+    values[sym_codes, date_codes] = df[value_col].values
+
+    return cls(values, symbols, dates)
+
+  @classmethod
+  def build(cls, file, symbols, reader):
+    '''Materializes a panel on disk by streaming the data of each symbol into a memory mapped file.
+
+    Args:
+      file (str): Folder to store the panel files into
+      symbols (list): List of symbols to include
+      reader (function): Function that receives a symbol name and returns a DataFrame with `date` and `value` column (or `None`)
+
+    Returns:
+      Memory mapped `PricePanel`
+    '''
+    # collect the data and the shared trading day axis
+    data = []
+    for symbol in symbols:
+      df = reader(symbol)
+      if df is None or df.empty: continue
+      data.append((symbol, df['date'].values.astype('datetime64[ns]'), df['value'].values))
+    if len(data) == 0:
+      raise ValueError("No data found to build the panel!")
+    dates = np.unique(np.concatenate([item[1] for item in data]))
+
+    # write the data into the memory mapped file
+    os.makedirs(file, exist_ok=True)
+    values = np.lib.format.open_memmap(os.path.join(file, 'values.npy'), mode='w+', dtype='float32', shape=(len(data), len(dates)))
+    values[:] = np.nan
+    for i, (_, sym_dates, sym_values) in enumerate(data):
+      values[i, np.searchsorted(dates, sym_dates)] = sym_values
+    values.flush()
+    del values
+
+    # store the axis
+    np.save(os.path.join(file, 'dates.npy'), dates)
+    pd.Series([item[0] for item in data], name='symbol').to_csv(os.path.join(file, 'symbols.csv'), index=False, header=True)
+
+    return cls.load(file)
+
+  @classmethod
+  def load(cls, file, mmap=True):
+    '''Loads a panel that was stored through `build`.
+
+    Args:
+      file (str): Folder that contains the panel files
+      mmap (bool): Defines if the values should be memory mapped instead of read into memory
+
+    Returns:
+      `PricePanel`
+    '''
+    values = np.load(os.path.join(file, 'values.npy'), mmap_mode='r' if mmap else None)
+    dates = np.load(os.path.join(file, 'dates.npy'))
+    symbols = pd.read_csv(os.path.join(file, 'symbols.csv'), keep_default_na=False)['symbol'].values
+    return cls(values, symbols, dates)
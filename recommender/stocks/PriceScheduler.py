@@ -0,0 +1,212 @@
+'''Event-driven scheduler that streams the prices of many symbols from a single background thread.
+
+The next due time of each symbol is kept in a heap, so the thread sleeps on a condition variable until the next poll
+(or a new subscription) instead of spinning. Due symbols are requested together through `Ticker.prices`, which uses
+batched quote requests where the provider supports them and is paced by the provider rate limits.
+'''
+
+import time
+import heapq
+import asyncio
+import threading
+import warnings
+
+
+class PriceScheduler():
+  '''Polls the prices of subscribed symbols and delivers updates through callbacks or an async iterator.
+
+  Only updates with a new timestamp are delivered.
+
+  Example:
+    ```
+    with PriceScheduler(FMPTicker(), interval=60) as scheduler:
+      scheduler.subscribe(['AAPL', 'MSFT'], callback=lambda symbol, price: print(symbol, price['close']))
+      ...
+
+    # or inside a coroutine
+    async for symbol, price in scheduler.stream():
+      ...
+    ```
+
+  Args:
+    ticker (Ticker): Ticker that is used to retrieve the prices
+    interval (float): Default number of seconds between two polls of a symbol
+    batch_size (int): Maximal number of symbols that are requested together
+    on_error (function): Function that receives the symbol and the exception of failed requests and callbacks (if None warn)
+  '''
+  def __init__(self, ticker, interval=60, batch_size=100, on_error=None):
+    self.ticker = ticker
+    self.interval = interval
+    self.batch_size = batch_size
+    self.on_error = on_error
+    self.errors = {}
+    self._cond = threading.Condition()
+    self._heap = []
+    self._symbols = {}
+    self._last = {}
+    self._listeners = []
+    self._thread = None
+    self._running = False
+
+  def subscribe(self, symbols, callback=None, interval=None):
+    '''Adds symbols to the schedule (they are polled directly).
+
+    Args:
+      symbols (list): List of symbols to poll
+      callback (function): Function that receives the symbol and the price dict of each update (optional)
+      interval (float): Number of seconds between two polls of these symbols (if None use the default)
+    '''
+    now = time.monotonic()
+    with self._cond:
+      for symbol in symbols:
+        if symbol not in self._symbols:
+          self._symbols[symbol] = {'interval': self.interval, 'callbacks': [], 'due': now}
+          heapq.heappush(self._heap, (now, symbol))
+        entry = self._symbols[symbol]
+        entry['interval'] = self.interval if interval is None else interval
+        if callback is not None:
+          entry['callbacks'].append(callback)
+      self._cond.notify()
+
+  def unsubscribe(self, symbols):
+    '''Removes symbols from the schedule.'''
+    with self._cond:
+      for symbol in symbols:
+        self._symbols.pop(symbol, None)
+        self._last.pop(symbol, None)
+      # note: outdated heap entries are skipped (see `_valid`)
+      self._cond.notify()
+
+  def last(self, symbol):
+    '''Retrieves the last delivered price of the given symbol (or None).'''
+    return self._last.get(symbol)
+
+  def start(self):
+    '''Starts the background thread.'''
+    with self._cond:
+      if self._running:
+        return self
+      self._running = True
+    self._thread = threading.Thread(target=self._run, name='PriceScheduler', daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self, timeout=None):
+    '''Stops the background thread (waits for a running request to finish).'''
+    with self._cond:
+      self._running = False
+      self._cond.notify_all()
+    if self._thread is not None:
+      self._thread.join(timeout)
+      self._thread = None
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()
+
+  def _valid(self, item):
+    '''Checks if the heap entry belongs to the current schedule of its symbol.'''
+    entry = self._symbols.get(item[1])
+    return entry is not None and entry['due'] == item[0]
+
+  def _next_batch(self):
+    '''Waits until symbols are due and pops them from the heap (returns None if stopped).'''
+    with self._cond:
+      while self._running:
+        # drop symbols that were unsubscribed
+        while len(self._heap) > 0 and not self._valid(self._heap[0]):
+          heapq.heappop(self._heap)
+        if len(self._heap) == 0:
+          self._cond.wait()
+          continue
+        wait = self._heap[0][0] - time.monotonic()
+        if wait > 0:
+          self._cond.wait(wait)
+          continue
+
+        # collect all due symbols (each symbol once)
+        now = time.monotonic()
+        batch = []
+        while len(self._heap) > 0 and self._heap[0][0] <= now and len(batch) < self.batch_size:
+          item = heapq.heappop(self._heap)
+          if self._valid(item):
+            batch.append(item[1])
+        if len(batch) > 0:
+          return batch
+    return None
+
+  def _report(self, symbol, error, msg):
+    '''Passes the error to `on_error` (or warns if not given).'''
+    if self.on_error is not None:
+      try:
+        self.on_error(symbol, error)
+        return
+      except Exception as e:
+        error = e
+    warnings.warn(msg.format(symbol, error))
+
+  def _run(self):
+    while True:
+      batch = self._next_batch()
+      if batch is None:
+        return
+
+      # request the prices (note: the ticker waits for the rate limits of the provider)
+      try:
+        prices, errors = self.ticker.prices(batch)
+      except Exception as e:
+        prices, errors = {}, dict((symbol, e) for symbol in batch)
+
+      # schedule the next polls
+      now = time.monotonic()
+      with self._cond:
+        for symbol in batch:
+          if symbol in self._symbols:
+            entry = self._symbols[symbol]
+            entry['due'] = now + entry['interval']
+            heapq.heappush(self._heap, (entry['due'], symbol))
+        callbacks = dict((symbol, list(entry['callbacks'])) for symbol, entry in self._symbols.items() if symbol in batch)
+        listeners = list(self._listeners)
+
+      # deliver the updates
+      for symbol, error in errors.items():
+        self.errors[symbol] = error
+        self._report(symbol, error, "Could not retrieve price for {} ({})")
+      for symbol, price in prices.items():
+        last = self._last.get(symbol)
+        if last is not None and last['timestamp'] == price['timestamp']:
+          continue
+        self._last[symbol] = price
+        self.errors.pop(symbol, None)
+        for callback in callbacks.get(symbol, []) + listeners:
+          # note: failing callbacks may not stop the updates of other subscriptions
+          try:
+            callback(symbol, price)
+          except Exception as e:
+            self._report(symbol, e, "Callback failed for {} ({})")
+
+  async def stream(self, symbols=None):
+    '''Async iterator over all price updates.
+
+    Args:
+      symbols (list): Symbols to subscribe before streaming (optional)
+
+    Returns:
+      Async generator of (symbol, price) tuples
+    '''
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue()
+    listener = lambda symbol, price: loop.call_soon_threadsafe(queue.put_nowait, (symbol, price))
+    with self._cond:
+      self._listeners.append(listener)
+    if symbols is not None:
+      self.subscribe(symbols)
+    self.start()
+    try:
+      while True:
+        yield await queue.get()
+    finally:
+      with self._cond:
+        self._listeners.remove(listener)
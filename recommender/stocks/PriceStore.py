@@ -0,0 +1,248 @@
+'''Columnar price store that keeps the history of each symbol in its own parquet partition.
+
+Every partition stores the dates as `int64` (nanoseconds since epoch) and the OHLCV values as `float32`.
+Partitions are written in row groups of roughly one trading year, so range queries only decode the relevant groups.
+'''
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from recommender import utils
+from .Manifest import Manifest
+
+# columns that are stored in each partition
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# number of rows per row group (about one year of trading days)
+ROW_GROUP_SIZE = 256
+
+
+def to_timestamp(dt):
+  '''Converts the given date into a timezone-naive `int64` timestamp (as used by the store).'''
+  ts = pd.Timestamp(dt)
+  if ts.tzinfo is not None:
+    ts = ts.tz_localize(None)
+  return ts.value
+
+def _first(dates):
+  '''Retrieves the first date of a sorted date Series (or None).'''
+  return dates.iloc[0] if len(dates) > 0 else None
+
+def _last(dates):
+  '''Retrieves the last date of a sorted date Series (or None).'''
+  return dates.iloc[-1] if len(dates) > 0 else None
+
+def format_prices(df):
+  '''Converts a DataFrame of prices into the common store format.
+
+  Args:
+    df (DataFrame): Price data with a `date` column (or index) and OHLCV columns in arbitrary case
+
+  Returns:
+    DataFrame with a timezone-naive `date` column sorted ascending and `float32` OHLCV columns
+  '''
+  if 'date' not in [str(col).lower() for col in df.columns]:
+    # note: the index of the tickers might be unnamed
+    df = df.rename_axis('date').reset_index()
+  df = df.rename(columns=lambda col: str(col).lower())
+
+  # convert the dates (vectorized, drop timezone info)
+  dates = pd.to_datetime(df['date'])
+  if getattr(dates.dt, 'tz', None) is not None:
+    dates = dates.dt.tz_localize(None)
+  df = df.assign(date=dates)
+
+  # convert the values
+  cols = [col for col in PRICE_COLUMNS if col in df.columns]
+  df = df.loc[:, ['date'] + cols]
+  df[cols] = df[cols].astype('float32')
+
+  return df.sort_values(by='date').reset_index(drop=True)
+
+def filter_prices(df, columns=None, start=None, end=None):
+  '''Filters a formated price DataFrame to the given columns and date range.
+
+  Args:
+    df (DataFrame): Price data in the format of `format_prices`
+    columns (list): List of value columns to keep (if None keep all)
+    start (datetime): First date to include (if None start from earliest)
+    end (datetime): Last date to include (if None include up to the latest)
+
+  Returns:
+    Filtered DataFrame
+  '''
+  if start is not None or end is not None:
+    dates = df['date'].values.astype('int64')
+    lo = 0 if start is None else np.searchsorted(dates, to_timestamp(start), side='left')
+    hi = len(dates) if end is None else np.searchsorted(dates, to_timestamp(end), side='right')
+    df = df.iloc[lo:hi]
+  if columns is not None:
+    df = df.loc[:, ['date'] + [col for col in columns if col != 'date']]
+  return df
+
+def read_partition(file, columns=None, start=None, end=None):
+  '''Reads a single partition file of the store (see `PriceStore.read`).'''
+  cols = None if columns is None else ['date'] + [col for col in columns if col != 'date']
+  pf = pq.ParquetFile(file)
+
+  # select the relevant row groups based on the date statistics
+  lo = None if start is None else to_timestamp(start)
+  hi = None if end is None else to_timestamp(end)
+  groups = []
+  for i in range(pf.num_row_groups):
+    stats = pf.metadata.row_group(i).column(0).statistics
+    if stats is not None and stats.has_min_max:
+      if (lo is not None and stats.max < lo) or (hi is not None and stats.min > hi):
+        continue
+    groups.append(i)
+
+  # read the data
+  if len(groups) == 0:
+    df = pf.schema.to_arrow_schema().empty_table().to_pandas()
+    if cols is not None: df = df[cols]
+  else:
+    df = pa.concat_tables([pf.read_row_group(i, columns=cols) for i in groups]).to_pandas()
+  df['date'] = pd.to_datetime(df['date'].values.astype('int64'))
+
+  return filter_prices(df, None, start, end).reset_index(drop=True)
+
+
+class PriceStore():
+  '''Stores price data partitioned by symbol in a columnar format.
+
+  Example:
+    ```
+    store = PriceStore('../data/Prices/Stocks')
+    df = store.read('aapl', columns=['close'], start='2010-01-01')
+    ```
+
+  Args:
+    folder (str): Folder that holds the partitions
+  '''
+  def __init__(self, folder):
+    self.path = folder
+    self.manifest = Manifest(os.path.join(self.path, 'manifest.jsonl'))
+    # create the manifest for partitions that were written without one
+    if not self.manifest.exists() and len(glob.glob(os.path.join(self.path, '*.parquet'))) > 0:
+      self.rebuild_manifest()
+
+  def rebuild_manifest(self):
+    '''Rebuilds the manifest from the partitions in the store folder.'''
+    files = glob.glob(os.path.join(self.path, '*.parquet'))
+    symbols = [os.path.basename(f)[:-len('.parquet')] for f in files]
+    for symbol in set(self.manifest.symbols()).difference(symbols):
+      self.manifest.remove(symbol, save=False)
+    for symbol, file in zip(symbols, files):
+      dates = pq.read_table(file, columns=['date']).column(0).to_pandas()
+      self.manifest.update(symbol, file, len(dates), _first(dates), _last(dates), save=False)
+    self.manifest.compact()
+
+  def last_date(self, symbol):
+    '''Retrieves the date of the last cached bar for the given symbol.
+
+    Args:
+      symbol (str): Name of the symbol
+
+    Returns:
+      `pd.Timestamp` of the last bar or `None` if the symbol is not in the store
+    '''
+    return self.manifest.last_date(symbol)
+
+  def file(self, symbol):
+    '''Retrieves the path of the partition for the given symbol.'''
+    return os.path.join(self.path, '{}.parquet'.format(symbol.lower()))
+
+  def symbols(self):
+    '''Lists all symbols that are available in the store.'''
+    return self.manifest.symbols()
+
+  def contains(self, symbol):
+    '''Checks if the given symbol has a partition in the store.'''
+    return symbol in self.manifest
+
+  def write(self, symbol, df, save_manifest=True):
+    '''Writes (or replaces) the partition of the given symbol.
+
+    Args:
+      symbol (str): Name of the symbol
+      df (DataFrame): Price data (will be converted through `format_prices`)
+      save_manifest (bool): Defines if the manifest entry should be persisted directly (otherwise call `manifest.save`)
+
+    Returns:
+      The formated DataFrame that was written
+    '''
+    df = format_prices(df)
+    # convert to the storage types
+    data = {'date': df['date'].values.astype('int64')}
+    for col in PRICE_COLUMNS:
+      data[col] = df[col].values if col in df.columns else np.full(len(df), np.nan, dtype='float32')
+    table = pa.Table.from_pandas(pd.DataFrame(data, columns=['date'] + PRICE_COLUMNS), preserve_index=False)
+
+    # write atomically to avoid broken partitions
+    file = self.file(symbol)
+    utils.atomic_write(file, lambda tmp: pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE))
+    self.manifest.update(symbol, file, len(df), _first(df['date']), _last(df['date']), save=save_manifest)
+
+    return df
+
+  def merge(self, symbol, df):
+    '''Merges new bars into the partition of the given symbol.
+
+    Bars with dates that already exist in the store are replaced by the new values.
+
+    Args:
+      symbol (str): Name of the symbol
+      df (DataFrame): New price data (will be converted through `format_prices`)
+
+    Returns:
+      Number of bars that were added to the partition
+    '''
+    df = format_prices(df)
+    if not self.contains(symbol):
+      self.write(symbol, df)
+      return len(df)
+    df_old = self.read(symbol)
+    df_new = pd.concat([df_old, df], axis=0, sort=False).drop_duplicates(subset='date', keep='last')
+    self.write(symbol, df_new)
+    return len(df_new) - len(df_old)
+
+  def read(self, symbol, columns=None, start=None, end=None):
+    '''Reads the price data of the given symbol.
+
+    Only the requested columns and the row groups that overlap the date range are decoded.
+
+    Args:
+      symbol (str): Name of the symbol
+      columns (list): List of value columns to read (if None read all)
+      start (datetime): First date to include (if None start from earliest)
+      end (datetime): Last date to include (if None include up to the latest)
+
+    Returns:
+      DataFrame with a `date` column and the requested value columns
+    '''
+    return read_partition(self.file(symbol), columns, start, end)
+
+  def convert(self, files, remove=False):
+    '''Converts the given csv price files (e.g. from the kaggle dataset) into store partitions.
+
+    Args:
+      files (dict): Dictionary of symbol names to csv files (as returned by `Cache.list_data`)
+      remove (bool): Defines if the original csv files should be deleted after conversion
+
+    Returns:
+      List of symbols that could not be converted
+    '''
+    failed = []
+    for symbol in files:
+      try:
+        self.write(symbol, pd.read_csv(files[symbol]), save_manifest=False)
+      except Exception:
+        failed.append(symbol)
+        continue
+      if remove:
+        os.remove(files[symbol])
+    self.manifest.compact()
+
+    return failed
@@ -5,43 +5,195 @@ Used mostly for historic data.
 '''
 
 
+import os
+import json
+import threading
 import quandl
+from quandl.errors.quandl_error import NotFoundError
+from datetime import datetime, timedelta
 from .Ticker import Ticker, TickerResolution, TickerGranularity
 from recommender import utils
 
+# databases that are probed (in order) to resolve a symbol
+PREFIXES = ["EOD", "CHRIS"]
+# time after which symbols that were not found are probed again
+MISS_TTL = timedelta(days=7)
+# default file of the resolved symbols (inside the default cache folder)
+DEFAULT_SYMBOL_FILE = os.path.join('..', 'data', 'quandl_symbols.json')
+
+# resolvers shared across all tickers (one per file)
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_resolver(file=None):
+  '''Retrieves the shared resolver for the given file (if None the resolver is only kept in memory).'''
+  key = None if file is None else os.path.abspath(file)
+  with _resolvers_lock:
+    if key not in _resolvers:
+      _resolvers[key] = SymbolResolver(file)
+    return _resolvers[key]
+
+
+class SymbolResolver():
+  '''Caches the quandl dataset codes of symbols (e.g. `AAPL` -> `EOD/AAPL`), including symbols that were not found.
+
+  Args:
+    file (str): Path of the json file to persist the resolutions in (if None only keep them in memory)
+    prefixes (list): Databases that are probed in order
+    miss_ttl (timedelta): Time after which symbols that were not found are probed again
+  '''
+  def __init__(self, file=None, prefixes=PREFIXES, miss_ttl=MISS_TTL):
+    self.file = file
+    self.prefixes = list(prefixes)
+    self.miss_ttl = miss_ttl
+    self._lock = threading.Lock()
+    self._flight = utils.parallel.SingleFlight()
+    self.entries = self._read()
+
+  def _read(self):
+    '''Reads the resolutions from disk.'''
+    if self.file is None or not os.path.exists(self.file):
+      return {}
+    with open(self.file, 'r') as f:
+      return json.load(f)
+
+  def _write(self, tmp):
+    with open(tmp, 'w') as f:
+      json.dump(self.entries, f)
+
+  def save(self):
+    '''Persists the resolutions (merged with the resolutions stored by other processes).'''
+    if self.file is None:
+      return
+    folder = os.path.dirname(self.file)
+    if len(folder) > 0:
+      os.makedirs(folder, exist_ok=True)
+    with utils.FileLock('{}.lock'.format(self.file)):
+      with self._lock:
+        self.entries = dict(self._read(), **self.entries)
+        utils.atomic_write(self.file, self._write)
+
+  def cached(self, symbol):
+    '''Retrieves the cached entry of the symbol (or None if it is unknown or an expired miss).'''
+    entry = self.entries.get(symbol.upper())
+    if entry is None:
+      return None
+    if entry['dataset'] is None and entry['expires'] < datetime.now().isoformat(timespec='seconds'):
+      return None
+    return entry
+
+  def probe(self, symbol):
+    '''Probes the databases for the symbol through the api (without using the cache).
+
+    Returns:
+      Dataset code of the symbol (None if not found in any database)
+
+    Raises:
+      Exception if a database could not be probed due to other errors than a missing dataset (e.g. network errors)
+    '''
+    error = None
+    for prefix in self.prefixes:
+      code = "{}/{}".format(prefix, symbol)
+      try:
+        utils.ratelimit.acquire('quandl')
+        quandl.get(code, rows=1)
+      except NotFoundError:
+        continue
+      except Exception as e:
+        error = e
+        continue
+      return code
+    # note: do not record a miss if a database was not reachable
+    if error is not None:
+      raise error
+    return None
+
+  def _resolve(self, symbol):
+    dataset = self.probe(symbol)
+    now = datetime.now()
+    with self._lock:
+      self.entries[symbol.upper()] = {
+        'dataset': dataset, 'time': now.isoformat(timespec='seconds'),
+        'expires': None if dataset is not None else (now + self.miss_ttl).isoformat(timespec='seconds')
+      }
+    return dataset
+
+  def resolve(self, symbol, save=True):
+    '''Resolves the dataset code of the symbol (from the cache or by probing the databases).
+
+    Returns:
+      Dataset code of the symbol (None if not found)
+    '''
+    entry = self.cached(symbol)
+    if entry is not None:
+      return entry['dataset']
+    dataset = self._flight.do(symbol.upper(), lambda: self._resolve(symbol))
+    if save: self.save()
+    return dataset
+
+  def resolve_many(self, symbols, workers=4):
+    '''Resolves all given symbols and persists the results once.
+
+    Args:
+      symbols (list): List of symbols
+      workers (int): Maximal number of concurrent probes
+
+    Returns:
+      datasets (dict): Dictionary of symbol to dataset code (None if not found)
+      errors (dict): Dictionary of symbol to the raised exception (for symbols that could not be probed)
+    '''
+    symbols = list(dict.fromkeys(symbols))
+    missing = [symbol for symbol in symbols if self.cached(symbol) is None]
+    results, fails = utils.parallel.map_parallel(lambda symbol: self.resolve(symbol, save=False), missing, workers, mode='thread')
+    if len(missing) > 0:
+      self.save()
+
+    errors = dict((missing[i], e) for i, e in fails.items())
+    datasets = dict((symbol, self.cached(symbol)['dataset']) for symbol in symbols if symbol not in errors)
+    return datasets, errors
+
+  def invalidate(self, symbol):
+    '''Removes the cached entry of the symbol (e.g. if its dataset was removed).'''
+    # note: stored as expired miss, so the entry is not restored from disk on the next `save`
+    with self._lock:
+      self.entries[symbol.upper()] = {'dataset': None, 'time': datetime.now().isoformat(timespec='seconds'), 'expires': ''}
+
 
 class QuandlTicker(Ticker):
   '''Ticker implementation for the Quandl API.
 
   Note that Quandl does not provide real-time data and has a delay of at-least 1 day. It also provides rarely a resolution finer than daily.
 
+  Dataset codes of the symbols are resolved once and shared across all tickers with the same `symbol_file`
+  (use `resolve_symbols` to resolve a whole list upfront).
+
   Args:
     key: `str` API key used for quandl access (if None try to load it through `utils.read_keys`)
+    symbol_file: `str` path of the json file that persists the resolved symbols (if None only keep them in memory)
   '''
 
-  def __init__(self, key=None):
+  def __init__(self, key=None, symbol_file=DEFAULT_SYMBOL_FILE):
     # check if key is none
     if key is None:
       key = utils.read_keys()['quandl']
     # setup system
     self.__key = key
+    self.resolver = get_resolver(symbol_file)
     # set the key to config
     quandl.ApiConfig.api_key = self.__key
 
+  def resolve_symbols(self, symbols, workers=4):
+    '''Resolves the dataset codes of all given symbols (see `SymbolResolver.resolve_many`).'''
+    return self.resolver.resolve_many(symbols, workers)
+
   def _update_symbol(self, symbol):
     '''Updates the given symbol for the quandl API.'''
-    # check if the symbol exists on the QUANDL
-    # TODO: extent list
-    for prefix in ["EOD", "CHRIS"]:
-      symb = "{}/{}".format(prefix, symbol)
-      # use try catch against 404 errors
-      try:
-        data = quandl.get(symb, rows=1)
-      except:
-        continue
-      # final symbol
-      return symb
-    return symbol
+    try:
+      dataset = self.resolver.resolve(symbol)
+    except Exception:
+      dataset = None
+    return symbol if dataset is None else dataset
 
   def price(self, symbol):
     '''Retrieves the current price of the given stock.
@@ -53,11 +205,15 @@ class QuandlTicker(Ticker):
       `dict` that contains open, close, volume, high, low, timestamp
     '''
     # update the ticker symbol to relevant name
-    symbol = self._update_symbol(symbol)
+    name, symbol = symbol, self._update_symbol(symbol)
 
     # retrieve the relevant data
+    utils.ratelimit.acquire('quandl')
     try:
       data = quandl.get(symbol, rows=1)
+    except NotFoundError:
+      self.resolver.invalidate(name)
+      raise ValueError("The given stock symbol ({}) was not found in quandl".format(symbol))
     except:
       raise ValueError("The given stock symbol ({}) was not found in quandl".format(symbol))
 
@@ -91,6 +247,7 @@ class QuandlTicker(Ticker):
       resolution = TickerResolution.from_string(resolution)
 
     # TODO: check the relevant time frame & resolution
+    utils.ratelimit.acquire('quandl')
     data = quandl.get(symbol, start_date=start, end_date=end)
 
     # TODO: update the pandas data
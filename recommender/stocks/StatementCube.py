@@ -0,0 +1,153 @@
+'''Dense cube of statement features that aligns all symbols on a shared (year, quarter) axis.
+
+The cube is a `float32` array of shape (periods, symbols, features), so single features, symbols or periods can be
+sliced in constant time (as views on the cube) instead of pivoting the merged statement frame for every request.
+'''
+
+import numpy as np
+import pandas as pd
+
+# columns of the merged statements that are no features
+META_COLUMNS = ['symbol', 'date', 'year', 'quarter', 'index']
+
+
+def _period_keys(df, date_col='date'):
+  '''Computes the period keys (`year * 4 + quarter - 1`) of the statements (vectorized).'''
+  if 'year' in df.columns and 'quarter' in df.columns:
+    return df['year'].values.astype('int64') * 4 + df['quarter'].values.astype('int64') - 1
+  dates = pd.DatetimeIndex(pd.to_datetime(df[date_col].values))
+  return dates.year.values.astype('int64') * 4 + dates.quarter.values.astype('int64') - 1
+
+
+class StatementCube():
+  '''Statement features of the shape periods x symbols x features.
+
+  Example:
+    ```
+    cube = StatementCube.from_frame(df_statements)
+    df_ebit = cube.feature('ebit')    # periods x symbols
+    cube.update(df_new)               # add newly merged statements
+    ```
+
+  Args:
+    values (np.ndarray): `float32` array of shape (periods, symbols, features)
+    keys (np.ndarray): Sorted period keys (`year * 4 + quarter - 1`, one per period)
+    symbols (list): List of symbol names
+    features (list): List of feature names
+  '''
+  def __init__(self, values=None, keys=None, symbols=None, features=None):
+    self.symbols = list(symbols or [])
+    self.features = list(features or [])
+    self._keys = np.asarray(keys if keys is not None else [], dtype='int64')
+    self.values = values if values is not None else np.full((len(self._keys), len(self.symbols), len(self.features)), np.nan, dtype='float32')
+    self._build_index()
+
+  def _build_index(self):
+    self._symbol_index = dict((symbol, i) for i, symbol in enumerate(self.symbols))
+    self._feature_index = dict((feat, i) for i, feat in enumerate(self.features))
+    self._periods = pd.MultiIndex.from_arrays([self._keys // 4, self._keys % 4 + 1], names=['year', 'quarter'])
+
+  @property
+  def periods(self):
+    '''Index of the periods as (year, quarter) tuples.'''
+    return self._periods
+
+  @property
+  def shape(self):
+    return self.values.shape
+
+  def feature(self, feat):
+    '''Retrieves a feature as DataFrame of periods x symbols (view on the cube).'''
+    return pd.DataFrame(self.values[:, :, self._feature_index[feat]], index=self._periods,
+      columns=pd.Index(self.symbols, name='symbol'), copy=False)
+
+  def symbol(self, symbol):
+    '''Retrieves all features of a symbol as DataFrame of periods x features (view on the cube).'''
+    return pd.DataFrame(self.values[:, self._symbol_index[symbol], :], index=self._periods, columns=self.features, copy=False)
+
+  def period(self, year, quarter):
+    '''Retrieves all features of a period as DataFrame of symbols x features (view on the cube).'''
+    i = np.searchsorted(self._keys, year * 4 + quarter - 1)
+    if i >= len(self._keys) or self._keys[i] != year * 4 + quarter - 1:
+      raise KeyError("Period ({}, {}) is not in the cube".format(year, quarter))
+    return pd.DataFrame(self.values[i], index=pd.Index(self.symbols, name='symbol'), columns=self.features, copy=False)
+
+  def get(self, feat, symbols=None):
+    '''Retrieves a feature for the given symbols (same output as `Statements.get_features`).
+
+    Args:
+      feat (str): Name of the feature
+      symbols (list): List of symbols (if None use all)
+
+    Returns:
+      DataFrame of (year, quarter) x symbols without periods or symbols that have no data
+    '''
+    df = self.feature(feat)
+    if symbols is not None:
+      cols = sorted(set(symbol for symbol in symbols if symbol in self._symbol_index))
+      df = df.loc[:, cols]
+    return df.dropna(how='all', axis=1).dropna(how='all', axis=0)
+
+  def _extend(self, keys, symbols, features):
+    '''Extends the axes of the cube by the given (unique) keys, symbols and features.'''
+    new_keys = np.setdiff1d(keys, self._keys)
+    new_symbols = [symbol for symbol in symbols if symbol not in self._symbol_index]
+    new_features = [feat for feat in features if feat not in self._feature_index]
+    if len(new_keys) == 0 and len(new_symbols) == 0 and len(new_features) == 0:
+      return
+
+    # copy the existing values into the extended cube
+    all_keys = np.union1d(self._keys, new_keys)
+    values = np.full((len(all_keys), len(self.symbols) + len(new_symbols), len(self.features) + len(new_features)), np.nan, dtype='float32')
+    values[np.ix_(np.searchsorted(all_keys, self._keys), np.arange(len(self.symbols)), np.arange(len(self.features)))] = self.values
+
+    self.values = values
+    self._keys = all_keys
+    self.symbols += new_symbols
+    self.features += new_features
+    self._build_index()
+
+  def update(self, df, features=None):
+    '''Adds statements to the cube (values of existing cells are replaced, duplicates are averaged).
+
+    Args:
+      df (DataFrame): Merged statements with a `symbol` and `date` (or `year` and `quarter`) column
+      features (list): Columns to add (if None use all numeric columns)
+
+    Returns:
+      The updated cube
+    '''
+    if df is None or df.empty:
+      return self
+    if features is None:
+      features = [col for col in df.columns if col not in META_COLUMNS and np.issubdtype(df[col].dtype, np.number)]
+    keys = _period_keys(df)
+    symbols = df['symbol'].values
+    self._extend(np.unique(keys), list(pd.unique(symbols)), features)
+
+    # find the cells of the rows
+    pc = np.searchsorted(self._keys, keys)
+    sc = pd.Index(self.symbols).get_indexer(symbols)
+    fc = np.array([self._feature_index[feat] for feat in features])
+    cells, inv = np.unique(pc * len(self.symbols) + sc, return_inverse=True)
+
+    # average duplicate rows (ignoring NaN values)
+    vals = df[features].values.astype('float64')
+    valid = ~np.isnan(vals)
+    sums = np.zeros((len(cells), len(features)))
+    counts = np.zeros((len(cells), len(features)))
+    np.add.at(sums, inv, np.where(valid, vals, 0))
+    np.add.at(counts, inv, valid)
+
+    # write the values (NaN values do not overwrite existing data)
+    up, us = np.divmod(cells, len(self.symbols))
+    idx = (up[:, None], us[:, None], fc[None, :])
+    with np.errstate(invalid='ignore', divide='ignore'):
+      self.values[idx] = np.where(counts > 0, sums / counts, self.values[idx])
+
+    return self
+
+  @classmethod
+  def from_frame(cls, df, features=None):
+    '''Creates the cube from merged statements (see `update`).'''
+    return cls().update(df, features)
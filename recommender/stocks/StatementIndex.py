@@ -0,0 +1,123 @@
+'''Point-in-time index over statements to find the latest statement of a symbol at a given date.
+
+Statements are sorted once by symbol and date and addressed through a combined integer key (`symbol code * span + day`),
+so vectors of (symbol, date) queries are answered with a single binary search without re-sorting any data.
+'''
+
+import numpy as np
+import pandas as pd
+from recommender import utils
+
+# range of days (since epoch) covered by the combined key (~1696 to ~2243)
+MIN_DAY = -100000
+DAY_SPAN = 200000
+
+
+def _days(dates):
+  '''Converts the dates into days since epoch (`NaT` becomes the minimal int).'''
+  return pd.DatetimeIndex(pd.to_datetime(dates)).values.astype('datetime64[D]').astype('int64')
+
+
+class StatementIndex():
+  '''As-of index of statements.
+
+  Example:
+    ```
+    index = StatementIndex(df_statements)
+    df = index.asof(['AAPL', 'MSFT'], ['2019-06-30', '2019-06-30'], tolerance=365)
+    ```
+
+  Args:
+    df (DataFrame): Statements with a `symbol` column and a `date` column (or index)
+    date_col (str): Name of the date column
+    is_sorted (bool): Defines if the statements are already sorted by symbol and date (e.g. loaded through `load`)
+  '''
+  def __init__(self, df, date_col='date', is_sorted=False):
+    if date_col not in df.columns:
+      df = df.reset_index()
+    df = df.assign(**{'symbol': df['symbol'].astype(str).str.upper(), date_col: pd.to_datetime(df[date_col])})
+    df = df[df[date_col].notnull()]
+    days = _days(df[date_col].values)
+    self.symbols, codes = np.unique(df['symbol'].values, return_inverse=True)
+
+    # sort by symbol and date
+    if not is_sorted:
+      order = np.lexsort((days, codes))
+      df, codes, days = df.iloc[order], codes[order], days[order]
+    self.data = df.reset_index(drop=True)
+    self.date_col = date_col
+    self._codes = codes
+    self._days = days
+    self._keys = codes.astype('int64') * DAY_SPAN + np.clip(days - MIN_DAY, 0, DAY_SPAN - 1)
+    # row offsets of each symbol in the sorted data
+    self.offsets = np.searchsorted(codes, np.arange(len(self.symbols) + 1))
+
+  def __len__(self):
+    return len(self.data)
+
+  def rows(self, symbol):
+    '''Retrieves the statements of the given symbol (sorted by date).'''
+    i = np.searchsorted(self.symbols, symbol.upper())
+    if i >= len(self.symbols) or self.symbols[i] != symbol.upper():
+      return self.data.iloc[0:0]
+    return self.data.iloc[self.offsets[i]:self.offsets[i + 1]]
+
+  def lookup(self, symbols, dates, tolerance=None):
+    '''Finds the latest statement at or before the given date for each (symbol, date) pair.
+
+    Args:
+      symbols (list): Symbols of the queries
+      dates (list): Dates of the queries
+      tolerance (int): Maximal age of the statement in days (if None no limit)
+
+    Returns:
+      `np.ndarray` of row positions in `data` (-1 if no statement matches)
+    '''
+    symbols = pd.Series(np.asarray(symbols)).astype(str).str.upper().values
+    days = _days(dates)
+    valid_day = ~pd.isnull(pd.to_datetime(dates))
+
+    # find the symbol codes
+    codes = np.searchsorted(self.symbols, symbols)
+    found = codes < len(self.symbols)
+    found[found] = self.symbols[codes[found]] == symbols[found]
+
+    # binary search on the combined key
+    keys = codes.astype('int64') * DAY_SPAN + np.clip(days - MIN_DAY, 0, DAY_SPAN - 1)
+    pos = np.searchsorted(self._keys, keys, side='right') - 1
+    safe = np.clip(pos, 0, None)
+    valid = found & valid_day & (pos >= 0)
+    if len(self._keys) > 0:
+      valid &= self._codes[safe] == codes
+      if tolerance is not None:
+        valid &= days - self._days[safe] <= tolerance
+    else:
+      valid[:] = False
+
+    return np.where(valid, pos, -1)
+
+  def asof(self, symbols, dates, columns=None, tolerance=None):
+    '''Retrieves the latest statement at or before the given date for each (symbol, date) pair.
+
+    Args:
+      symbols (list): Symbols of the queries
+      dates (list): Dates of the queries
+      columns (list): Columns of the statements to retrieve (if None all)
+      tolerance (int): Maximal age of the statement in days (if None no limit)
+
+    Returns:
+      DataFrame with one row per query (`NaN` if no statement matches)
+    '''
+    pos = self.lookup(symbols, dates, tolerance)
+    data = self.data if columns is None else self.data[columns]
+    # note: -1 is not in the index, so unmatched queries become NaN rows
+    return data.reindex(pos).reset_index(drop=True)
+
+  def save(self, file):
+    '''Persists the sorted statements as parquet file.'''
+    utils.atomic_write(file, lambda tmp: self.data.to_parquet(tmp, index=False))
+
+  @classmethod
+  def load(cls, file, date_col='date'):
+    '''Loads an index that was stored through `save`.'''
+    return cls(pd.read_parquet(file), date_col=date_col, is_sorted=True)
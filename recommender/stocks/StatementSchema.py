@@ -0,0 +1,102 @@
+'''Declarative schemas that map the statements of the providers into the common statement format.
+
+Schemas are registered per provider, statement type and (optionally) period, and compiled once into a vectorized
+transform (rename, select, cast, date parsing and date filter) that normalizes a statement in a single pass.
+'''
+
+import pandas as pd
+import numpy as np
+
+
+class StatementSchema():
+  '''Compiled mapping from the columns of a provider to the common statement format.
+
+  Example:
+    ```
+    schema = StatementSchema({'Total debt': 'debt_total', 'Total assets': 'assets_total'})
+    df = schema.transform(df_raw, before=date(2019, 1, 1))
+    ```
+
+  Args:
+    fields (dict): Dictionary of provider column names to common column names (the order defines the output columns)
+    date_col (str): Name of the provider column that holds the date
+    date_format (str): Format of the dates (if None let pandas infer it)
+    dtype (str): Name of the dtype of the values
+    columns (list): Common columns of the output (columns without provider field are `NaN` - if None use the fields)
+  '''
+  def __init__(self, fields, date_col='date', date_format='%Y-%m-%d', dtype='float32', columns=None):
+    self.fields = dict(fields)
+    self.date_col = date_col
+    self.date_format = date_format
+    self.dtype = dtype
+    # compile the mapping
+    self.columns = list(self.fields.values()) if columns is None else list(columns)
+    inverse = dict((target, source) for source, target in self.fields.items())
+    self._sources = [inverse.get(col) for col in self.columns]
+
+  def extend(self, fields, columns=None):
+    '''Creates a new schema that contains additional fields.'''
+    if columns is None and self.columns != list(self.fields.values()):
+      columns = self.columns + [col for col in fields.values() if col not in self.columns]
+    return StatementSchema(dict(self.fields, **fields), self.date_col, self.date_format, self.dtype, columns)
+
+  def parse_dates(self, values):
+    '''Parses the given date values into a `pd.DatetimeIndex` (invalid dates are `NaT`).'''
+    return pd.DatetimeIndex(pd.to_datetime(values, format=self.date_format, errors='coerce'))
+
+  def transform(self, df, before=None, after=None):
+    '''Converts the raw statements of the provider into the common format.
+
+    Args:
+      df (DataFrame): Raw statements with one row per date
+      before (date): Only include statements before the given date
+      after (date): Only include statements after the given date
+
+    Returns:
+      DataFrame with the common columns (missing ones are `NaN`) and a `date` index
+    '''
+    dates = self.parse_dates(df[self.date_col].values)
+
+    # filter the relevant dates
+    mask = ~dates.isna()
+    if before is not None:
+      mask &= dates < pd.Timestamp(before)
+    if after is not None:
+      mask &= dates > pd.Timestamp(after)
+
+    # select and cast all columns at once
+    values = df.reindex(columns=self._sources)
+    if not all(np.issubdtype(dtype, np.number) for dtype in values.dtypes):
+      values = values.apply(pd.to_numeric, errors='coerce')
+    values = values.values[mask].astype(self.dtype)
+
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates[mask], name='date'), columns=self.columns)
+
+
+_schemas = {}
+
+
+def register_schema(provider, statement, schema, period=None, **kwargs):
+  '''Registers the schema of a provider.
+
+  Args:
+    provider (str): Name of the provider (e.g. 'fmp')
+    statement (str): Type of the statement (e.g. 'balance_sheet', 'income', 'cash_flow', 'growth')
+    schema (StatementSchema): The schema (or a dictionary of fields to create it from)
+    period (str): Period the schema is specific to (if None used for all periods without specific schema)
+    kwargs: Additional arguments for `StatementSchema` if `schema` is a dictionary
+
+  Returns:
+    The registered `StatementSchema`
+  '''
+  if isinstance(schema, dict):
+    schema = StatementSchema(schema, **kwargs)
+  _schemas[(provider, statement, period)] = schema
+  return schema
+
+def get_schema(provider, statement, period=None):
+  '''Retrieves the registered schema of the provider for the given statement type and period.'''
+  schema = _schemas.get((provider, statement, period), _schemas.get((provider, statement, None)))
+  if schema is None:
+    raise KeyError("No schema registered for {} statement ({}) of {}".format(statement, period, provider))
+  return schema
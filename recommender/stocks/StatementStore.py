@@ -0,0 +1,99 @@
+'''Partitioned store for merged company statements.
+
+Statements are stored in one parquet partition per symbol inside a folder per period (e.g. `quarter` or `annual`).
+Writes are append-only (new symbols create new partitions) and guarded by a file lock, so concurrent writers are safe.
+'''
+
+import os
+import glob
+import pandas as pd
+from recommender import utils
+
+
+class StatementStore():
+  '''Stores merged statement data partitioned by symbol.
+
+  Args:
+    folder (str): Folder that holds the partitions of a single period
+  '''
+  def __init__(self, folder):
+    self.path = folder
+    self._lock = os.path.join(self.path, '.lock')
+
+  def file(self, symbol):
+    '''Retrieves the path of the partition for the given symbol.'''
+    return os.path.join(self.path, '{}.parquet'.format(symbol.upper()))
+
+  def symbols(self):
+    '''Lists all symbols that are available in the store.'''
+    files = glob.glob(os.path.join(self.path, '*.parquet'))
+    return [os.path.basename(f)[:-len('.parquet')] for f in files]
+
+  def contains(self, symbol):
+    '''Checks if the given symbol has a partition in the store.'''
+    return os.path.exists(self.file(symbol))
+
+  def read(self, symbols=None, workers=None):
+    '''Reads the statements of the given symbols.
+
+    Args:
+      symbols (list): List of symbols to read (if None read all symbols in the store)
+      workers (int): Number of processes used to parse the partitions (if None read serially)
+
+    Returns:
+      DataFrame with the merged statements or `None` if no data is found
+    '''
+    if symbols is None:
+      symbols = self.symbols()
+    files = [self.file(symbol) for symbol in symbols if self.contains(symbol)]
+    if len(files) == 0:
+      return None
+    data, errors = utils.parallel.map_parallel(pd.read_parquet, files, workers, mode='process')
+    if len(errors) > 0:
+      raise errors[min(errors)]
+    return pd.concat(data, axis=0, sort=True).reset_index(drop=True)
+
+  def append(self, df, overwrite=False):
+    '''Adds the statements of new symbols to the store.
+
+    Symbols that already have a partition are skipped, unless `overwrite` is set.
+
+    Args:
+      df (DataFrame): Merged statements with a `symbol` and `date` column
+      overwrite (bool): Defines if existing partitions should be replaced
+
+    Returns:
+      List of symbols that were written
+    '''
+    if df is None or df.empty:
+      return []
+    df = df.assign(date=pd.to_datetime(df['date']))
+
+    written = []
+    with utils.FileLock(self._lock):
+      for symbol, df_sym in df.groupby('symbol'):
+        file = self.file(symbol)
+        if os.path.exists(file) and not overwrite:
+          continue
+        df_sym = df_sym.sort_values(by='date').reset_index(drop=True)
+        utils.atomic_write(file, lambda tmp: df_sym.to_parquet(tmp, index=False))
+        written.append(symbol)
+
+    return written
+
+  def convert(self, file, remove=False):
+    '''Imports the statements of a legacy csv cache (e.g. `statements.csv`) into the store.
+
+    Args:
+      file (str): Path to the csv file
+      remove (bool): Defines if the csv file should be deleted after conversion
+
+    Returns:
+      List of symbols that were imported
+    '''
+    df = pd.read_csv(file)
+    df = df.drop([col for col in df.columns if col.startswith('Unnamed')], axis=1)
+    symbols = self.append(df)
+    if remove:
+      os.remove(file)
+    return symbols
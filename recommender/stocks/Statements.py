@@ -9,48 +9,76 @@ Use-Cases:
 from abc import ABC, abstractmethod
 import pandas as pd
 import functools
+import threading
 import warnings
+from .StatementCube import StatementCube
+from recommender import utils
+
+_flight_lock = threading.Lock()
+_cube_lock = threading.Lock()
 
 
 class Statements():
   '''Base Class for retrieving statements about a public traded company.'''
 
-  def merge_records(self, stocks, before=None, after=None, annual_growth=True):
+  # statement types that are merged (in order of the joined columns)
+  STATEMENT_TYPES = ['balance_sheet', 'income', 'cash_flow', 'growth']
+
+  def _flight(self):
+    '''Retrieves the de-duplication of in-flight requests of this instance.'''
+    with _flight_lock:
+      if getattr(self, '_inflight', None) is None:
+        self._inflight = utils.parallel.SingleFlight()
+      return self._inflight
+
+  def _load_statement(self, stock, kind, before=None, after=None, annual_growth=True):
+    '''Loads a single statement type of the given stock (overlapping calls share one request).'''
+    def load():
+      if kind != 'growth':
+        return getattr(self, kind)(stock, before, after)
+      if annual_growth:
+        try:
+          return self.growth(stock, before, after, period='annual')
+        except Exception:
+          pass
+      return self.growth(stock, before, after)
+    key = (kind, stock, str(before), str(after), annual_growth if kind == 'growth' else None)
+    return self._flight().do(key, load)
+
+  def merge_records(self, stocks, before=None, after=None, annual_growth=True, workers=8):
     '''Merges different statements into one dataframe.
 
+    All statement types of all stocks are loaded concurrently. Statements that failed to load are listed per symbol in
+    `Statements.errors` (dictionary of symbol to a dictionary of statement type to exception).
+
     Args:
       stocks (list): List of stock symbols to load
       before (date): Date before which the statements should be issued
       after (date): Date after which the statements should be issued
       annual_growth (bool): Defines if growth statements should always be captured annually
+      workers (int): Maximal number of concurrent requests (if None load serially)
 
     Returns:
       Merged DataFrame of all records
     '''
+    # load all statements concurrently
+    tasks = [(stock, kind) for stock in dict.fromkeys(stocks) for kind in self.STATEMENT_TYPES]
+    results, fails = utils.parallel.map_parallel(
+      lambda task: self._load_statement(task[0], task[1], before, after, annual_growth), tasks, workers, mode='thread')
+
+    # collect the statements per stock
+    self.errors = {}
+    states = dict((stock, []) for stock, _ in tasks)
+    for i, (stock, kind) in enumerate(tasks):
+      if i in fails:
+        self.errors.setdefault(stock, {})[kind] = fails[i]
+      else:
+        states[stock].append(results[i])
+
     # iterate through all data
     dfs = []
     for stock in stocks:
-      # retrieve data
-      df_state = []
-      try:
-        df_state.append(self.balance_sheet(stock, before, after))
-      except: pass
-      try:
-        df_state.append(self.income(stock, before, after))
-      except: pass
-      try:
-        df_state.append(self.cash_flow(stock, before, after))
-      except: pass
-      try:
-        if annual_growth:
-          try:
-            df_state.append(self.growth(stock, before, after, period='annual'))
-          except:
-            df_state.append(self.growth(stock, before, after))
-        else:
-          df_state.append(self.growth(stock, before, after))
-      except: pass
-
+      df_state = states[stock]
       # check if valid
       if len(df_state) == 0: continue
 
@@ -65,7 +93,10 @@ class Statements():
     if len(dfs) == 0:
       warnings.warn("No statements found for given symbols")
       return pd.DataFrame()
-    return pd.concat(dfs, axis=0, sort=True)
+    df = pd.concat(dfs, axis=0, sort=True)
+
+    self._update_cube(df)
+    return df
 
   def add_quarter(self, df, date_col='date', change_date=True):
     '''Updates the given dataframe to include quarter and year columns based on the 'date' column.
@@ -80,9 +111,9 @@ class Statements():
     '''
     # retrieve the column
     date = df[date_col]
-    # check type
-    if date.dtype == 'object':
-      date = date.apply(lambda x: datetime.strptime(x, '%Y-%m-%d'))
+    # check type (vectorized parsing)
+    if not pd.api.types.is_datetime64_any_dtype(date):
+      date = pd.to_datetime(date, format='%Y-%m-%d')
       if change_date: df[date_col] = date
 
     # retrieve data
@@ -91,22 +122,44 @@ class Statements():
 
     return df
 
+  def statement_cube(self, df=None):
+    '''Retrieves the cached feature cube of the given statements (see `StatementCube`).
+
+    The cube is only rebuilt if a different dataframe is given. Statements loaded through `merge_records` are added to
+    the cached cube automatically.
+
+    Args:
+      df (DataFrame): Merged statements (if None use the cached cube)
+
+    Returns:
+      `StatementCube`
+    '''
+    with _cube_lock:
+      if df is not None and getattr(self, '_cube_source', None) is not df:
+        self._cube = StatementCube.from_frame(df)
+        self._cube_source = df
+      if getattr(self, '_cube', None) is None:
+        self._cube = StatementCube()
+      return self._cube
+
+  def _update_cube(self, df):
+    '''Adds newly merged statements to the cached feature cube (if it was already built).'''
+    with _cube_lock:
+      if getattr(self, '_cube', None) is not None:
+        self._cube.update(df)
+
   def get_features(self, df, symbols, feat):
     '''Retrieves features from the statement dataframe.
 
     Args:
+      df (DataFrame): Merged statements (if None use the statements of the cached cube)
       symbols (list): list of symbols to use
       feat (str): Feature to extract
 
     Returns:
-      DataFrame using
+      DataFrame with (year, quarter) as index and symbols as columns
     '''
-    # check if date is there
-    if 'year' not in df.columns or 'quarter' not in df.columns:
-      df = self.add_quarter(df)
-
-    # convert and return
-    return df[df['symbol'].isin(symbols)].pivot_table(index=['year', 'quarter'], columns='symbol', values=feat).sort_index(ascending=True)
+    return self.statement_cube(df).get(feat, symbols)
 
   @abstractmethod
   def balance_sheet(self, symbol, before=None, after=None):
@@ -7,9 +7,11 @@ Use Cases:
 
 from abc import ABC, abstractmethod
 from enum import Enum
-from datetime import datetime
 import re
-import tzlocal, time
+import time
+import warnings
+import pandas as pd
+from recommender import utils
 
 class TickerGranularity(Enum):
   '''Defines the resolution of the stock ticker.'''
@@ -53,6 +55,24 @@ class TickerResolution():
       return TickerResolution(TickerGranularity.INTRADAY, min_interval=int(m.group(1)))
     raise ValueError("Unable to parse string ({}) into valid resolution!".format(str))
 
+def to_panel(frames):
+  '''Aligns the prices of many symbols into a wide panel.
+
+  Args:
+    frames: `dict` of symbol to `pd.dataframe` in the format of `Ticker.historic`
+
+  Returns:
+    `pd.dataframe` with the union of all dates as index and columns `pd.MultiIndex` of (field, symbol)
+  '''
+  frames = dict((symbol, df[~df.index.duplicated(keep='last')]) for symbol, df in frames.items() if df is not None and not df.empty)
+  if len(frames) == 0:
+    return pd.DataFrame(columns=pd.MultiIndex.from_arrays([[], []], names=['field', 'symbol']))
+  fields = list(dict.fromkeys(col for df in frames.values() for col in df.columns))
+  panel = pd.concat(frames, axis=1, sort=True)
+  panel.columns = panel.columns.swaplevel(0, 1)
+  panel = panel.reindex(columns=pd.MultiIndex.from_product([fields, list(frames.keys())], names=['field', 'symbol']))
+  return panel.sort_index()
+
 class RepeatMode(Enum):
   '''Defines the types of repeat modes for the generator.'''
   LAST = 0, # reuse the last value on next call
@@ -87,6 +107,26 @@ class Ticker():
     data = self.price(symbol)
     return data["close"], data["timestamp"]
 
+  def prices(self, symbols):
+    '''Retrieves the current prices of many stocks.
+
+    Providers that support batched quote requests should override this function (default calls `price` per symbol).
+
+    Args:
+      symbols: `list` of symbol names
+
+    Returns:
+      prices: `dict` of symbol to the output of `price`
+      errors: `dict` of symbol to the raised exception
+    '''
+    prices, errors = {}, {}
+    for symbol in symbols:
+      try:
+        prices[symbol] = self.price(symbol)
+      except Exception as e:
+        errors[symbol] = e
+    return prices, errors
+
 
   @abstractmethod
   def historic(self, symbol, start, end=None, resolution='daily'):
@@ -104,38 +144,80 @@ class Ticker():
     '''
     pass
 
-  def generator(self, symbol, repeat=RepeatMode.WAIT, sleep_time=0.01):
+  def historic_tail(self, symbol, since, resolution='daily'):
+    '''Retrieves the latest bars starting from the given date (used to refresh cached data).
+
+    Providers that support smaller responses for recent data should override this function.
+
+    Args:
+      symbol: `str` of the symbol name
+      since: `datetime` of the last known bar
+      resolution: `TickerResolution` or `str` on the resolution of the data.
+
+    Returns:
+      `pd.dataframe` in the same format as `historic` (might include bars before `since`)
+    '''
+    return self.historic(symbol, start=since, resolution=resolution)
+
+  def historic_many(self, symbols, start, end=None, resolution='daily', workers=8):
+    '''Retrieves the historic prices of many stocks as wide panel.
+
+    Providers with bulk endpoints should override this function (default calls `historic` concurrently per symbol).
+
+    Args:
+      symbols: `list` of symbol names
+      start: `datetime` or `long` of the starting point (`None` = from earliest)
+      end: `datetime` or `long` of the ending point (`None` = up to current)
+      resolution: `TickerResolution` or `str` on the resolution of the data.
+      workers: `int` maximal number of concurrent requests (if None or 1 load serially)
+
+    Returns:
+      panel: `pd.dataframe` of dates x (field, symbol) (see `to_panel` - e.g. `panel['close']` is dates x symbols)
+      errors: `dict` of symbol to the raised exception
+    '''
+    symbols = list(dict.fromkeys(symbols))
+    fetch = lambda symbol: self.historic(symbol, start, end=end, resolution=resolution)
+    data, fails = utils.parallel.map_parallel(fetch, symbols, workers, mode='thread')
+    errors = dict((symbols[i], e) for i, e in fails.items())
+    frames = dict((symbol, df) for symbol, df in zip(symbols, data) if symbol not in errors)
+    return to_panel(frames), errors
+
+  def generator(self, symbol, repeat=RepeatMode.WAIT, sleep_time=0.01, interval=60):
     '''Creates a generator for the stock data, allowing to retrieve the newest values if possible (otherwise yield None).
 
     Note that the usage of a `RepeatMode` other than `WAIT` might result in a endless loop that consumes all resources!
+    To follow many symbols use a `PriceScheduler` instead.
 
     Args:
       symbol: `str` name of the symbol to retrieve
       repeat: `bool` that shows if the last value should be repeated if no new value is available
+      sleep_time: `float` unused (kept for compatibility - `WAIT` sleeps until the next poll)
+      interval: `float` number of seconds between two requests
 
     Returns:
       Generator that has the same output format as `price`
     '''
     last = None
+    next_poll = 0
     while True:
-      # check if enough time has passed
-      tz = tzlocal.get_localzone()
-      if last is None or (tz.localize(datetime.now()) - last['timestamp']).total_seconds() > 60:
-        # retrieve new data
-        old_ts = 0 if last is None else last['timestamp']
+      # check if the next request is due
+      now = time.monotonic()
+      if now >= next_poll:
+        next_poll = now + interval
         try:
-          last = self.price(symbol)
-          # check if different from old
-          if old_ts != last['timestamp']:
-            yield last
-            continue
-        except:
-          time.sleep(sleep_time)
+          price = self.price(symbol)
+        except Exception as e:
+          warnings.warn("Could not retrieve price for {} ({})".format(symbol, e))
+          price = None
+        # check if different from old
+        if price is not None and (last is None or last['timestamp'] != price['timestamp']):
+          last = price
+          yield last
           continue
       # different repeat strategies
       if repeat == RepeatMode.LAST: yield last
       elif repeat == RepeatMode.NONE: yield None
-      elif repeat == RepeatMode.WAIT: time.sleep(sleep_time)
+      elif repeat == RepeatMode.WAIT: time.sleep(max(0, next_poll - time.monotonic()))
 
 
   # TODO: which types of general data do exist?
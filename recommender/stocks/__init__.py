@@ -1,7 +1,18 @@
 from .Ticker import *
 from .AlphaVantageTicker import *
 from .QuandlTicker import *
+from .FMPTicker import *
+from .CompositeTicker import *
+from .PriceScheduler import *
 from .Statements import *
+from .StatementSchema import *
+from .StatementCube import *
+from .StatementIndex import *
 from .FMPStatements import *
 from .IEXStatements import *
+from .PriceStore import *
+from .Manifest import *
+from .PricePanel import *
+from .NegativeCache import *
+from .StatementStore import *
 from .Cache import *
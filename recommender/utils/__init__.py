@@ -1,3 +1,7 @@
 from .times import *
 from . import math
 from .secret import *
+from .files import *
+from . import parallel
+from . import http
+from . import ratelimit
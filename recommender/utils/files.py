@@ -0,0 +1,76 @@
+'''Helper for safe file access from multiple threads and processes.'''
+
+import os
+import threading
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+  import msvcrt
+
+
+class FileLock():
+  '''Exclusive lock based on a lock file that is shared across threads and processes.
+
+  Example:
+    ```
+    with FileLock('../data/Statements/.lock'):
+      # write data
+    ```
+
+  Args:
+    file (str): Path of the lock file (created if it does not exist)
+  '''
+  def __init__(self, file):
+    self.file = file
+    self._fd = None
+
+  def acquire(self):
+    '''Blocks until the lock is acquired.'''
+    os.makedirs(os.path.dirname(os.path.abspath(self.file)), exist_ok=True)
+    fd = os.open(self.file, os.O_RDWR | os.O_CREAT)
+    try:
+      if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+      else:
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+    except:
+      os.close(fd)
+      raise
+    self._fd = fd
+
+  def release(self):
+    '''Releases the lock.'''
+    if self._fd is None:
+      return
+    if fcntl is not None:
+      fcntl.flock(self._fd, fcntl.LOCK_UN)
+    else:
+      os.lseek(self._fd, 0, os.SEEK_SET)
+      msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+    os.close(self._fd)
+    self._fd = None
+
+  def __enter__(self):
+    self.acquire()
+    return self
+
+  def __exit__(self, type, value, traceback):
+    self.release()
+
+def atomic_write(file, write_fct):
+  '''Writes a file atomically by writing to a temporary file first and replacing the target afterwards.
+
+  Args:
+    file (str): Path of the target file
+    write_fct (function): Function that receives the temporary path and writes the data to it
+  '''
+  os.makedirs(os.path.dirname(os.path.abspath(file)), exist_ok=True)
+  # note: include the thread id, so concurrent threads of one process do not share the temp file
+  tmp = '{}.{}.{}.tmp'.format(file, os.getpid(), threading.get_ident())
+  try:
+    write_fct(tmp)
+    os.replace(tmp, file)
+  finally:
+    if os.path.exists(tmp):
+      os.remove(tmp)
@@ -0,0 +1,33 @@
+'''Helper to create pooled HTTP sessions that retry failed requests.'''
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+# default timeout for (connect, read) in seconds
+DEFAULT_TIMEOUT = (5, 30)
+# status codes that are retried
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def create_session(retries=5, backoff=0.5, pool_size=32, status=RETRY_STATUS):
+  '''Creates a keep-alive session with connection pooling and retries with exponential backoff.
+
+  Args:
+    retries (int): Maximal number of retries per request
+    backoff (float): Backoff factor in seconds (waits `backoff * 2^(retry - 1)` between retries)
+    pool_size (int): Number of connections that are kept alive per host
+    status (tuple): HTTP status codes that should be retried
+
+  Returns:
+    `requests.Session` object
+  '''
+  retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=status, raise_on_status=False)
+  adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+  session = requests.Session()
+  session.mount('https://', adapter)
+  session.mount('http://', adapter)
+  session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Accept': 'application/json'})
+
+  return session
@@ -0,0 +1,112 @@
+'''Helper to execute functions concurrently with a bounded number of workers.'''
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+
+
+class _SafeCall():
+  '''Wraps a function to return the result or the raised exception (picklable for process pools).'''
+  def __init__(self, fct):
+    self.fct = fct
+
+  def __call__(self, item):
+    try:
+      return True, self.fct(item)
+    except Exception as e:
+      return False, e
+
+def map_parallel(fct, items, workers=None, mode='thread'):
+  '''Applies the function to all items with a bounded pool of workers.
+
+  Errors are collected per item instead of aborting the execution.
+
+  Args:
+    fct (function): Function that receives a single item (has to be picklable for `process` mode)
+    items (list): List of items to process
+    workers (int): Maximal number of concurrent workers (if None or 1 execute serially)
+    mode (str): Type of the pool (options: 'thread' for I/O bound functions, 'process' for CPU bound functions)
+
+  Returns:
+    results (list): List of results in the same order as `items` (`None` for failed items)
+    errors (dict): Dictionary of the failed item indices to the raised exceptions
+  '''
+  if mode not in ['thread', 'process']:
+    raise ValueError("Unkown mode ({})".format(mode))
+  items = list(items)
+  call = _SafeCall(fct)
+
+  # execute the function
+  if workers is None or workers <= 1 or len(items) <= 1:
+    outputs = [call(item) for item in items]
+  elif mode == 'thread':
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+      outputs = list(pool.map(call, items))
+  else:
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+      outputs = list(pool.map(call, items, chunksize=max(1, len(items) // (workers * 4))))
+
+  # split results and errors
+  results, errors = [], {}
+  for i, (success, value) in enumerate(outputs):
+    results.append(value if success else None)
+    if not success:
+      errors[i] = value
+
+  return results, errors
+
+def chunks(items, size):
+  '''Splits the given items into consecutive lists of at most `size` elements.
+
+  Args:
+    items (list): List of items to split
+    size (int): Maximal number of items per chunk
+
+  Returns:
+    Generator of lists
+  '''
+  if size < 1:
+    raise ValueError("Chunk size may not be smaller than 1 (current value: {})".format(size))
+  items = list(items)
+  for i in range(0, len(items), size):
+    yield items[i:i + size]
+
+class SingleFlight():
+  '''De-duplicates concurrent calls, so overlapping callers with the same key share the result of a single execution.
+
+  Example:
+    ```
+    flight = SingleFlight()
+    df = flight.do(('income', 'AAPL'), lambda: statements.income('AAPL'))
+    ```
+  '''
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._calls = {}
+
+  def do(self, key, fct):
+    '''Executes the function unless a call with the same key is already in flight (then wait for its result).
+
+    Args:
+      key: Hashable key that identifies the call
+      fct (function): Function without arguments to execute
+
+    Returns:
+      The result of the function (exceptions are raised for all waiting callers)
+    '''
+    with self._lock:
+      future = self._calls.get(key)
+      owner = future is None
+      if owner:
+        future = Future()
+        self._calls[key] = future
+    if not owner:
+      return future.result()
+
+    try:
+      future.set_result(fct())
+    except Exception as e:
+      future.set_exception(e)
+    finally:
+      with self._lock:
+        del self._calls[key]
+    return future.result()
@@ -0,0 +1,136 @@
+'''Provider-keyed rate limiting to keep the API calls within the quotas of the data providers.
+
+Each provider has a token bucket (with burst) that refills according to the per-minute quota and an additional daily budget.
+Limiters are thread-safe and can also be awaited from asyncio code without blocking the event loop.
+
+Example:
+  ```
+  configure('alphavantage', per_minute=5, per_day=500)
+  acquire('alphavantage')   # blocks until the request may be send
+  ```
+'''
+
+import time
+import asyncio
+import threading
+from datetime import date
+
+# default limits of the free plans (per_minute, per_day, burst)
+DEFAULT_LIMITS = {
+  'alphavantage': (5, 500, 5),
+  'fmp': (300, None, 10),
+  'quandl': (200, 50000, 20),
+  'iex': (6000, None, 100)
+}
+
+
+class RateLimitExceeded(Exception):
+  '''Raised if the daily budget of a provider is exhausted.'''
+  pass
+
+
+class RateLimiter():
+  '''Token bucket rate limiter with a per-minute rate, burst size and daily budget.
+
+  Args:
+    per_minute (int): Number of requests per minute (if None no rate limit)
+    per_day (int): Number of requests per day (if None no daily limit)
+    burst (int): Maximal number of requests that can be send at once (if None use `per_minute`)
+  '''
+  def __init__(self, per_minute=None, per_day=None, burst=None):
+    self.per_minute = per_minute
+    self.per_day = per_day
+    self.burst = burst if burst is not None else (per_minute if per_minute is not None else 1)
+    self._lock = threading.Lock()
+    self._tokens = float(self.burst)
+    self._updated = time.monotonic()
+    self._day = date.today()
+    self._day_count = 0
+
+  def _refill(self, now):
+    '''Refills the bucket and resets the daily budget (has to be called with lock).'''
+    if self.per_minute is not None:
+      self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.per_minute / 60.)
+    self._updated = now
+    today = date.today()
+    if today != self._day:
+      self._day = today
+      self._day_count = 0
+
+  def _reserve(self):
+    '''Reserves a request and returns the number of seconds to wait before it may be send.'''
+    with self._lock:
+      self._refill(time.monotonic())
+      if self.per_day is not None and self._day_count >= self.per_day:
+        raise RateLimitExceeded("Daily rate limit of {} requests exhausted".format(self.per_day))
+      self._day_count += 1
+      if self.per_minute is None:
+        return 0.
+      # note: tokens might become negative, which queues the following requests
+      self._tokens -= 1
+      return 0. if self._tokens >= 0 else -self._tokens * 60. / self.per_minute
+
+  def acquire(self):
+    '''Blocks until the next request may be send.'''
+    wait = self._reserve()
+    if wait > 0:
+      time.sleep(wait)
+
+  async def acquire_async(self):
+    '''Waits (without blocking the event loop) until the next request may be send.'''
+    wait = self._reserve()
+    if wait > 0:
+      await asyncio.sleep(wait)
+
+  def remaining(self):
+    '''Retrieves the remaining budget.
+
+    Returns:
+      Dict with the number of requests that can be send immediately (`burst`) and the remaining daily requests (`day`)
+    '''
+    with self._lock:
+      self._refill(time.monotonic())
+      return {
+        'burst': None if self.per_minute is None else max(0, int(self._tokens)),
+        'day': None if self.per_day is None else max(0, self.per_day - self._day_count)
+      }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def configure(provider, per_minute=None, per_day=None, burst=None):
+  '''Sets the limits of the given provider (e.g. for paid plans).
+
+  Args:
+    provider (str): Name of the provider (e.g. 'alphavantage', 'fmp', 'quandl', 'iex')
+    per_minute (int): Number of requests per minute (if None no rate limit)
+    per_day (int): Number of requests per day (if None no daily limit)
+    burst (int): Maximal number of requests that can be send at once (if None use `per_minute`)
+
+  Returns:
+    The new `RateLimiter`
+  '''
+  with _limiters_lock:
+    _limiters[provider] = RateLimiter(per_minute, per_day, burst)
+    return _limiters[provider]
+
+def get_limiter(provider):
+  '''Retrieves the shared limiter of the given provider (created with `DEFAULT_LIMITS` on first use).'''
+  with _limiters_lock:
+    if provider not in _limiters:
+      _limiters[provider] = RateLimiter(*DEFAULT_LIMITS.get(provider, (None, None, None)))
+    return _limiters[provider]
+
+def acquire(provider):
+  '''Blocks until the next request to the given provider may be send.'''
+  get_limiter(provider).acquire()
+
+async def acquire_async(provider):
+  '''Waits (without blocking the event loop) until the next request to the given provider may be send.'''
+  await get_limiter(provider).acquire_async()
+
+def remaining(provider):
+  '''Retrieves the remaining budget of the given provider (see `RateLimiter.remaining`).'''
+  return get_limiter(provider).remaining()